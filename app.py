@@ -1,16 +1,126 @@
-from flask import Flask, render_template, redirect, url_for, flash, request
+from flask import (Flask, Blueprint, render_template, redirect, url_for, flash, request, Response, stream_with_context,
+                   jsonify, g, abort, session, has_request_context, before_render_template, template_rendered)
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SecureCookieSession
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy import (or_, and_, func, event, inspect, text, select, insert, update, delete, union_all,
+                        MetaData)
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.orm import joinedload, aliased, Session
+from flask_login import (LoginManager, UserMixin, login_user, logout_user, login_required, current_user,
+                         user_logged_in)
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, date, timedelta
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+from itertools import islice, repeat
+from types import SimpleNamespace
+import click
+import csv
+import gzip
+import hashlib
+import heapq
+import io
+import json
 import os
+import random
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SESSION_SECRET', 'hospital-management-system-secret-key-12345')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hospital.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///hospital.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))
+app.config['PAGE_SIZES'] = (25, 50, 100, 200)
+app.config['DEFAULT_PAGE_SIZE'] = 50
+app.config['STREAM_YIELD_PER'] = 500
+app.config['STREAM_BUFFER_SIZE'] = 20
+app.config['BOOKING_RETRIES'] = 3
+app.config['BOOKING_RETRY_DELAY'] = 0.05
+app.config['BOOKING_WINDOW_DAYS'] = 7
+app.config['AVAILABILITY_TTL'] = 60
+app.config['RECENT_APPOINTMENTS'] = 10
+app.config['STATS_RESYNC_SECONDS'] = 300
+app.config['SEARCH_RESULT_LIMIT'] = 100
+app.config['IDENTITY_CACHE_SIZE'] = 10000
+app.config['IDENTITY_CACHE_TTL'] = int(os.environ.get('IDENTITY_CACHE_TTL', 300))
+app.config['EXPORT_YIELD_PER'] = 2000
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED') == '1'
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 0))
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+app.config['HASH_WORKERS'] = int(os.environ.get('HASH_WORKERS', os.cpu_count() or 1))
+app.config['HASH_QUEUE_LIMIT'] = int(os.environ.get('HASH_QUEUE_LIMIT', 32))
+app.config['HASH_RETRY_AFTER'] = 5
+app.config['LOGIN_MAX_ATTEMPTS'] = int(os.environ.get('LOGIN_MAX_ATTEMPTS', 5))
+app.config['LOGIN_MAX_ATTEMPTS_PER_IP'] = int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_IP', 50))
+app.config['LOGIN_ATTEMPT_WINDOW'] = int(os.environ.get('LOGIN_ATTEMPT_WINDOW', 300))
+app.config['LOGIN_ATTEMPT_CACHE_SIZE'] = 100000
+app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'local')
+app.config['CACHE_URL'] = os.environ.get('CACHE_URL', 'redis://localhost:6379/0')
+app.config['CACHE_KEY_PREFIX'] = os.environ.get('CACHE_KEY_PREFIX', 'hospital:')
+app.config['CACHE_SIZE'] = 1000
+app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+app.config['ARCHIVE_BATCH_SIZE'] = 5000
+app.config['BULK_MAX_DAYS'] = 366
+app.config['TIMELINE_PAGE_SIZE'] = 20
+app.config['API_PAGE_SIZE'] = 50
+app.config['API_MAX_PAGE_SIZE'] = 200
+app.config['API_COMPRESS_MIN_SIZE'] = 500
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 1))
+app.config['JOB_POLL_INTERVAL'] = 1.0
+app.config['JOB_MAX_ATTEMPTS'] = 5
+app.config['JOB_RETRY_DELAY'] = 5
+app.config['JOB_LEASE_SECONDS'] = 300
+app.config['JOB_RETENTION_DAYS'] = int(os.environ.get('JOB_RETENTION_DAYS', 7))
+app.config['JOB_FAILED_RETENTION_DAYS'] = int(os.environ.get('JOB_FAILED_RETENTION_DAYS', 30))
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'cookie')
+app.config['SESSION_SQLITE_PATH'] = os.environ.get('SESSION_SQLITE_PATH')
+app.config['SESSION_MEMORY_SIZE'] = int(os.environ.get('SESSION_MEMORY_SIZE', 10000))
+app.config['SESSION_TTL'] = int(os.environ.get('SESSION_TTL', 86400))
+app.config['PRINCIPAL_MAX_AGE'] = int(os.environ.get('PRINCIPAL_MAX_AGE', 60))
+app.config['EVENT_STREAMING'] = os.environ.get('EVENT_STREAMING', 'auto')
+app.config['EVENT_MAX_CONNECTIONS'] = int(os.environ.get('EVENT_MAX_CONNECTIONS', 500))
+app.config['EVENT_HEARTBEAT'] = 15
+app.config['EVENT_STREAM_SECONDS'] = int(os.environ.get('EVENT_STREAM_SECONDS', 300))
+app.config['EVENT_POLL_SECONDS'] = int(os.environ.get('EVENT_POLL_SECONDS', 5))
+app.config['EVENT_QUEUE_SIZE'] = 100
+app.config['EVENT_RETENTION_SECONDS'] = 3600
+
+SLOT_TIMES = ['09:00 AM', '10:00 AM', '11:00 AM', '12:00 PM', '02:00 PM', '03:00 PM', '04:00 PM', '05:00 PM']
+SLOT_BITS = {slot_time: 1 << i for i, slot_time in enumerate(SLOT_TIMES)}
+ALL_SLOTS = (1 << len(SLOT_TIMES)) - 1
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
 
-db = SQLAlchemy(app)
+db = SQLAlchemy()
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
@@ -38,7 +148,7 @@ class Department(db.Model):
 class Doctor(db.Model):
     __tablename__ = 'doctors'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20))
@@ -53,7 +163,7 @@ class Doctor(db.Model):
 class Patient(db.Model):
     __tablename__ = 'patients'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     full_name = db.Column(db.String(100), nullable=False)
     date_of_birth = db.Column(db.Date)
     gender = db.Column(db.String(10))
@@ -68,11 +178,23 @@ class Patient(db.Model):
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_patient_date', 'patient_id', 'appointment_date'),
+        db.Index('ix_appointments_date_id', 'appointment_date', 'id'),
+        db.Index('ix_appointments_created_at', 'created_at'),
+        db.Index('ix_appointments_doctor_start', 'doctor_id', 'appointment_date', 'slot_minute'),
+        db.Index('uq_appointments_active_slot', 'doctor_id', 'appointment_date', 'appointment_time',
+                 unique=True,
+                 sqlite_where=db.text("status != 'Cancelled'"),
+                 postgresql_where=db.text("status != 'Cancelled'")),
+        {'sqlite_autoincrement': True},
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
     appointment_date = db.Column(db.Date, nullable=False)
     appointment_time = db.Column(db.String(10), nullable=False)
+    slot_minute = db.Column(db.SmallInteger)
     status = db.Column(db.String(20), default='Booked')
     symptoms = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -81,52 +203,1990 @@ class Appointment(db.Model):
 
 class Treatment(db.Model):
     __tablename__ = 'treatments'
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
-    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False, index=True)
     diagnosis = db.Column(db.Text, nullable=False)
     prescription = db.Column(db.Text)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class DoctorPatient(db.Model):
+    __tablename__ = 'doctor_patients'
+    __table_args__ = (
+        db.Index('ix_doctor_patients_recent', 'doctor_id', 'last_visit', 'patient_id'),
+    )
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), primary_key=True)
+    first_visit = db.Column(db.Date, nullable=False)
+    last_visit = db.Column(db.Date, nullable=False)
+    visit_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    patient = db.relationship('Patient')
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    idempotency_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class FeedEvent(db.Model):
+    __tablename__ = 'feed_events'
+    __table_args__ = (
+        db.Index('ix_feed_events_doctor_id', 'doctor_id', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ArchivePartition(db.Model):
+    __tablename__ = 'archive_partitions'
+    year = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def parse_slot_minute(appointment_time):
+    try:
+        slot = datetime.strptime((appointment_time or '').strip().upper(), '%I:%M %p')
+    except ValueError:
+        return None
+    return slot.hour * 60 + slot.minute
+
+@event.listens_for(Appointment.appointment_time, 'set')
+def sync_slot_minute(target, value, oldvalue, initiator):
+    target.slot_minute = parse_slot_minute(value)
+
+def starts_at_or_after(moment):
+    return or_(
+        Appointment.appointment_date > moment.date(),
+        and_(Appointment.appointment_date == moment.date(),
+             Appointment.slot_minute >= moment.hour * 60 + moment.minute)
+    )
+
+def starts_before(moment):
+    return or_(
+        Appointment.appointment_date < moment.date(),
+        and_(Appointment.appointment_date == moment.date(),
+             Appointment.slot_minute < moment.hour * 60 + moment.minute)
+    )
+
+def appointments_between(doctor_id, start, end):
+    return Appointment.query.options(*appointment_listing_options()).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.appointment_date >= start.date(),
+        Appointment.appointment_date <= end.date(),
+        starts_at_or_after(start),
+        starts_before(end),
+        Appointment.status == 'Booked'
+    ).order_by(Appointment.appointment_date, Appointment.slot_minute)
+
+def appointment_listing_options():
+    return (
+        joinedload(Appointment.patient),
+        joinedload(Appointment.doctor).joinedload(Doctor.department),
+    )
+
+def appointment_history_options():
+    return appointment_listing_options() + (joinedload(Appointment.treatment),)
+
+def get_page_size():
+    per_page = request.args.get('per_page', app.config['DEFAULT_PAGE_SIZE'], type=int)
+    if per_page not in app.config['PAGE_SIZES']:
+        per_page = app.config['DEFAULT_PAGE_SIZE']
+    return per_page
+
+def wants_stream():
+    return request.args.get('stream') == '1'
+
+def after_id_filter(column):
+    after = request.args.get('after', type=int)
+    return column > after if after else None
+
+def appointment_cursor(appointment):
+    return '%s_%d' % (appointment.appointment_date.isoformat(), appointment.id)
+
+def date_cursor_filter(date_column, id_column):
+    cursor = request.args.get('after', '')
+    try:
+        cursor_date, cursor_id = cursor.split('_')
+        cursor_date = datetime.strptime(cursor_date, '%Y-%m-%d').date()
+        cursor_id = int(cursor_id)
+    except ValueError:
+        return None
+    return or_(
+        date_column < cursor_date,
+        and_(date_column == cursor_date, id_column < cursor_id)
+    )
+
+def appointment_cursor_filter():
+    return date_cursor_filter(Appointment.appointment_date, Appointment.id)
+
+def roster_cursor(entry):
+    return '%s_%d' % (entry.last_visit.isoformat(), entry.patient_id)
+
+def keyset_page(query, per_page, cursor_of):
+    rows = query.limit(per_page + 1).all()
+    next_cursor = cursor_of(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+def stream_listing(template_name, **context):
+    template = app.jinja_env.get_template(template_name)
+    app.update_template_context(context)
+    stream = template.stream(context)
+    stream.enable_buffering(app.config['STREAM_BUFFER_SIZE'])
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+def render_listing(template_name, items_name, query, per_page, cursor_of, **context):
+    context['per_page'] = per_page
+    if wants_stream():
+        context[items_name] = query.yield_per(app.config['STREAM_YIELD_PER'])
+        return stream_listing(template_name, next_cursor=None, **context)
+    context[items_name], next_cursor = keyset_page(query, per_page, cursor_of)
+    return render_template(template_name, next_cursor=next_cursor, **context)
+
+def parse_available_days(text):
+    text = (text or '').lower()
+    if not text.strip() or re.search(r'\b(daily|all|everyday)\b|\bevery\s+day\b', text):
+        return set(range(7))
+    
+    days = set()
+    text = re.sub(r'\s+(to|through|till)\s+', '-', text)
+    for token in re.split(r'[,/;&]|\band\b', text):
+        names = [name[:3] for name in re.findall(r'[a-z]+', token)]
+        names = [name for name in names if name in WEEKDAY_NAMES]
+        if '-' in token and len(names) == 2:
+            start, end = WEEKDAY_NAMES.index(names[0]), WEEKDAY_NAMES.index(names[1])
+            day = start
+            days.add(day)
+            while day != end:
+                day = (day + 1) % 7
+                days.add(day)
+        else:
+            days.update(WEEKDAY_NAMES.index(name) for name in names)
+    
+    return days or set(range(7))
+
+class AvailabilityEntry:
+    def __init__(self, weekdays, free):
+        self.built_on = date.today()
+        self.built_at = time.monotonic()
+        self.weekdays = weekdays
+        self.free = free
+    
+    def is_stale(self):
+        return (self.built_on != date.today() or
+                time.monotonic() - self.built_at > app.config['AVAILABILITY_TTL'])
+
+class AvailabilityIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.doctors = {}
+    
+    def window(self):
+        today = date.today()
+        return [today + timedelta(days=i) for i in range(1, app.config['BOOKING_WINDOW_DAYS'] + 1)]
+    
+    def build(self, doctor_id):
+        dates = self.window()
+        doctor = db.session.get(Doctor, doctor_id)
+        weekdays = parse_available_days(doctor.available_days if doctor else '')
+        free = {day: ALL_SLOTS if day.weekday() in weekdays else 0 for day in dates}
+        
+        booked = db.session.query(Appointment.appointment_date, Appointment.appointment_time).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.appointment_date >= dates[0],
+            Appointment.appointment_date <= dates[-1],
+            Appointment.status != 'Cancelled'
+        )
+        for appointment_date, appointment_time in booked:
+            if appointment_date in free:
+                free[appointment_date] &= ~SLOT_BITS.get(appointment_time, 0)
+        
+        return AvailabilityEntry(weekdays, free)
+    
+    def get(self, doctor_id):
+        with self.lock:
+            entry = self.doctors.get(doctor_id)
+        if entry is None or entry.is_stale():
+            entry = self.build(doctor_id)
+            with self.lock:
+                self.doctors[doctor_id] = entry
+        return entry.free
+    
+    def free_slots(self, doctor_id):
+        free = self.get(doctor_id)
+        return {
+            day.isoformat(): [slot_time for slot_time in SLOT_TIMES if mask & SLOT_BITS[slot_time]]
+            for day, mask in free.items() if mask
+        }
+    
+    def available_dates(self, doctor_id):
+        return [day for day, mask in self.get(doctor_id).items() if mask]
+    
+    def is_free(self, doctor_id, appointment_date, appointment_time):
+        return bool(self.get(doctor_id).get(appointment_date, 0) & SLOT_BITS.get(appointment_time, 0))
+    
+    def update(self, doctor_id, appointment_date, appointment_time, booked):
+        with self.lock:
+            entry = self.doctors.get(doctor_id)
+            if entry is None or appointment_date not in entry.free:
+                return
+            bit = SLOT_BITS.get(appointment_time, 0)
+            if booked:
+                entry.free[appointment_date] &= ~bit
+            elif appointment_date.weekday() in entry.weekdays:
+                entry.free[appointment_date] |= bit
+    
+    def mark_booked(self, doctor_id, appointment_date, appointment_time):
+        self.update(doctor_id, appointment_date, appointment_time, True)
+    
+    def mark_free(self, doctor_id, appointment_date, appointment_time):
+        self.update(doctor_id, appointment_date, appointment_time, False)
+    
+    def invalidate(self, doctor_id):
+        with self.lock:
+            self.doctors.pop(doctor_id, None)
+
+availability = AvailabilityIndex()
+
+class DashboardStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded_at = None
+    
+    def load(self):
+        doctor_departments = dict(db.session.query(Doctor.id, Doctor.department_id))
+        total_patients = db.session.query(func.count(Patient.id)).scalar()
+        by_status = Counter(dict(
+            db.session.query(Appointment.status, func.count(Appointment.id)).group_by(Appointment.status)
+        ))
+        by_doctor = Counter(dict(
+            db.session.query(Appointment.doctor_id, func.count(Appointment.id)).group_by(Appointment.doctor_id)
+        ))
+        for year in archive_years(db.session):
+            appointments, treatments = archive_tables(year)
+            by_status.update(dict(db.session.execute(
+                select(appointments.c.status, func.count()).group_by(appointments.c.status)
+            ).all()))
+            by_doctor.update(dict(db.session.execute(
+                select(appointments.c.doctor_id, func.count()).group_by(appointments.c.doctor_id)
+            ).all()))
+        recent = db.session.query(Appointment.id).order_by(
+            Appointment.created_at.desc()
+        ).limit(app.config['RECENT_APPOINTMENTS'])
+        
+        with self.lock:
+            self.doctor_departments = doctor_departments
+            self.totals = Counter(
+                doctors=len(doctor_departments),
+                patients=total_patients,
+                appointments=sum(by_status.values())
+            )
+            self.by_status = by_status
+            self.by_doctor = by_doctor
+            self.recent = deque(reversed([row.id for row in recent]), maxlen=app.config['RECENT_APPOINTMENTS'])
+            self.loaded_at = time.monotonic()
+    
+    def ensure_loaded(self):
+        resync = app.config['STATS_RESYNC_SECONDS']
+        if self.loaded_at is None or (resync and time.monotonic() - self.loaded_at > resync):
+            self.load()
+    
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
+    
+    def snapshot(self):
+        self.ensure_loaded()
+        with self.lock:
+            by_department = Counter()
+            for doctor_id, count in self.by_doctor.items():
+                by_department[self.doctor_departments.get(doctor_id)] += count
+            return {
+                'totals': dict(self.totals),
+                'by_status': dict(self.by_status),
+                'by_department': dict(by_department),
+                'recent_ids': list(reversed(self.recent)),
+            }
+    
+    def collect(self, session):
+        changes = []
+        for obj in session.new:
+            if isinstance(obj, Doctor):
+                changes.append(('doctor', obj.id, obj.department_id, 1))
+            elif isinstance(obj, Patient):
+                changes.append(('patient', obj.id, None, 1))
+        for obj in session.deleted:
+            if isinstance(obj, Doctor):
+                changes.append(('doctor', obj.id, obj.department_id, -1))
+            elif isinstance(obj, Patient):
+                changes.append(('patient', obj.id, None, -1))
+        for obj in session.dirty:
+            if isinstance(obj, Doctor):
+                history = inspect(obj).attrs.department_id.history
+                if history.has_changes():
+                    changes.append(('doctor_department', obj.id, obj.department_id, 0))
+        
+        for obj in session.new:
+            if isinstance(obj, Appointment):
+                changes.append(('appointment', obj.id, (obj.doctor_id, obj.status), 1))
+        for obj in session.deleted:
+            if isinstance(obj, Appointment):
+                changes.append(('appointment', obj.id, (obj.doctor_id, obj.status), -1))
+        for obj in session.dirty:
+            if isinstance(obj, Appointment):
+                state = inspect(obj)
+                status = state.attrs.status.history
+                doctor_id = state.attrs.doctor_id.history
+                if status.has_changes() or doctor_id.has_changes():
+                    old_status = status.deleted[0] if status.deleted else obj.status
+                    old_doctor_id = doctor_id.deleted[0] if doctor_id.deleted else obj.doctor_id
+                    changes.append(('appointment_update', obj.id, (old_doctor_id, old_status), -1))
+                    changes.append(('appointment_update', obj.id, (obj.doctor_id, obj.status), 1))
+        return changes
+    
+    def apply(self, changes):
+        with self.lock:
+            if self.loaded_at is None:
+                return
+            for kind, obj_id, value, delta in changes:
+                if kind == 'doctor':
+                    self.totals['doctors'] += delta
+                    if delta > 0:
+                        self.doctor_departments[obj_id] = int(value)
+                    else:
+                        self.doctor_departments.pop(obj_id, None)
+                elif kind == 'doctor_department':
+                    self.doctor_departments[obj_id] = int(value)
+                elif kind == 'patient':
+                    self.totals['patients'] += delta
+                else:
+                    doctor_id, status = value
+                    self.by_status[status] += delta
+                    self.by_doctor[doctor_id] += delta
+                    if kind == 'appointment':
+                        self.totals['appointments'] += delta
+                        if delta > 0:
+                            self.recent.append(obj_id)
+                        elif obj_id in self.recent:
+                            self.recent.remove(obj_id)
+
+stats = DashboardStats()
+
+@event.listens_for(Session, 'after_flush')
+def collect_stats_changes(session, flush_context):
+    changes = stats.collect(session)
+    if changes:
+        session.info.setdefault('stats_changes', []).extend(changes)
+
+@event.listens_for(Session, 'after_commit')
+def apply_stats_changes(session):
+    changes = session.info.pop('stats_changes', None)
+    if changes:
+        stats.apply(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_stats_changes(session):
+    session.info.pop('stats_changes', None)
+
+ARCHIVE_STATUSES = ('Completed', 'Cancelled')
+archive_metadata = db.MetaData()
+
+def copy_columns(table):
+    return [db.Column(column.name, column.type, primary_key=column.primary_key) for column in table.columns]
+
+def archive_tables(year):
+    name = 'appointments_archive_%d' % year
+    treatments_name = 'treatments_archive_%d' % year
+    if name not in archive_metadata.tables:
+        db.Table(name, archive_metadata, *copy_columns(Appointment.__table__),
+                 db.Index('ix_%s_patient_date' % name, 'patient_id', 'appointment_date'),
+                 db.Index('ix_%s_doctor_patient' % name, 'doctor_id', 'patient_id'))
+        db.Table(treatments_name, archive_metadata, *copy_columns(Treatment.__table__),
+                 db.Index('ix_%s_appointment_id' % treatments_name, 'appointment_id'))
+    return archive_metadata.tables[name], archive_metadata.tables[treatments_name]
+
+def archive_years(connection):
+    return connection.execute(select(ArchivePartition.year).order_by(ArchivePartition.year)).scalars().all()
+
+def ensure_archive_partition(connection, year):
+    appointments, treatments = archive_tables(year)
+    appointments.create(connection, checkfirst=True)
+    treatments.create(connection, checkfirst=True)
+    if connection.execute(select(ArchivePartition.year).where(ArchivePartition.year == year)).first() is None:
+        connection.execute(insert(ArchivePartition).values(year=year, created_at=datetime.utcnow()))
+    return appointments, treatments
+
+def archive_appointments(cutoff, batch_size, progress=None):
+    progress = progress or (lambda count: None)
+    appointment_columns = [column.name for column in Appointment.__table__.columns]
+    treatment_columns = [column.name for column in Treatment.__table__.columns]
+    archived = 0
+    while True:
+        with db.engine.begin() as connection:
+            rows = connection.execute(select(Appointment.id, Appointment.appointment_date).where(
+                Appointment.appointment_date < cutoff,
+                Appointment.status.in_(ARCHIVE_STATUSES)
+            ).order_by(Appointment.appointment_date, Appointment.id).limit(batch_size)).all()
+            if not rows:
+                break
+            by_year = defaultdict(list)
+            for appointment_id, appointment_date in rows:
+                by_year[appointment_date.year].append(appointment_id)
+            for year, ids in by_year.items():
+                appointments, treatments = ensure_archive_partition(connection, year)
+                connection.execute(insert(appointments).from_select(
+                    appointment_columns, select(Appointment.__table__).where(Appointment.id.in_(ids))
+                ))
+                connection.execute(insert(treatments).from_select(
+                    treatment_columns, select(Treatment.__table__).where(Treatment.appointment_id.in_(ids))
+                ))
+            ids = [row.id for row in rows]
+            connection.execute(delete(Treatment).where(Treatment.appointment_id.in_(ids)))
+            connection.execute(delete(Appointment).where(Appointment.id.in_(ids)))
+        archived += len(rows)
+        progress(archived)
+    stats.invalidate()
+    return archived
+
+def history_sources(connection):
+    return [(Appointment.__table__, Treatment.__table__)] + [
+        archive_tables(year) for year in reversed(archive_years(connection))
+    ]
+
+def treatment_timeline(patient_id, doctor_id, per_page):
+    entries = []
+    for appointments, treatments in history_sources(db.session):
+        query = select(
+            appointments.c.id,
+            appointments.c.appointment_date,
+            appointments.c.appointment_time,
+            appointments.c.symptoms,
+            treatments.c.diagnosis,
+            func.coalesce(func.length(treatments.c.prescription), 0).label('prescription_length'),
+            func.coalesce(func.length(treatments.c.notes), 0).label('notes_length')
+        ).outerjoin(treatments, treatments.c.appointment_id == appointments.c.id).where(
+            appointments.c.patient_id == patient_id,
+            appointments.c.doctor_id == doctor_id,
+            appointments.c.status == 'Completed'
+        )
+        after = date_cursor_filter(appointments.c.appointment_date, appointments.c.id)
+        if after is not None:
+            query = query.where(after)
+        query = query.order_by(appointments.c.appointment_date.desc(), appointments.c.id.desc()).limit(per_page + 1)
+        entries.extend(db.session.execute(query).all())
+    
+    entries.sort(key=lambda entry: (entry.appointment_date, entry.id), reverse=True)
+    next_cursor = appointment_cursor(entries[per_page - 1]) if len(entries) > per_page else None
+    return entries[:per_page], next_cursor
+
+def timeline_entry(entry):
+    return {
+        'id': entry.id,
+        'appointment_date': entry.appointment_date.isoformat(),
+        'appointment_time': entry.appointment_time,
+        'symptoms': entry.symptoms,
+        'diagnosis': entry.diagnosis,
+        'has_prescription': entry.prescription_length > 0,
+        'has_notes': entry.notes_length > 0,
+    }
+
+def treatment_details(appointment_id, patient_id, doctor_id):
+    for appointments, treatments in history_sources(db.session):
+        row = db.session.execute(select(treatments.c.prescription, treatments.c.notes).join(
+            appointments, appointments.c.id == treatments.c.appointment_id
+        ).where(
+            appointments.c.id == appointment_id,
+            appointments.c.patient_id == patient_id,
+            appointments.c.doctor_id == doctor_id
+        )).first()
+        if row is not None:
+            return row
+    return None
+
+def appointment_history(patient_id, doctor_id=None, status=None, before=None):
+    def criteria(columns):
+        conditions = [columns.patient_id == patient_id]
+        if doctor_id is not None:
+            conditions.append(columns.doctor_id == doctor_id)
+        if status is not None:
+            conditions.append(columns.status == status)
+        if before is not None:
+            conditions.append(columns.appointment_date < before)
+        return conditions
+    
+    history = Appointment.query.options(*appointment_history_options()).filter(*criteria(Appointment)).all()
+    
+    archived = []
+    for year in archive_years(db.session):
+        if before is not None and year > before.year:
+            continue
+        appointments, treatments = archive_tables(year)
+        archived.extend(db.session.execute(select(
+            appointments,
+            treatments.c.id.label('treatment_id'),
+            treatments.c.diagnosis,
+            treatments.c.prescription,
+            treatments.c.notes
+        ).outerjoin(treatments, treatments.c.appointment_id == appointments.c.id).where(
+            *criteria(appointments.c)
+        )).all())
+    
+    if archived:
+        doctor_ids = {row.doctor_id for row in archived}
+        doctors = {doctor.id: doctor for doctor in Doctor.query.options(joinedload(Doctor.department)).filter(
+            Doctor.id.in_(doctor_ids))}
+        for row in archived:
+            treatment = None
+            if row.treatment_id is not None:
+                treatment = SimpleNamespace(id=row.treatment_id, diagnosis=row.diagnosis,
+                                            prescription=row.prescription, notes=row.notes)
+            history.append(SimpleNamespace(
+                id=row.id,
+                patient_id=row.patient_id,
+                doctor_id=row.doctor_id,
+                doctor=doctors.get(row.doctor_id),
+                appointment_date=row.appointment_date,
+                appointment_time=row.appointment_time,
+                status=row.status,
+                symptoms=row.symptoms,
+                created_at=row.created_at,
+                treatment=treatment,
+                archived=True
+            ))
+    
+    history.sort(key=lambda appointment: (appointment.appointment_date, appointment.id), reverse=True)
+    return history
+
+def roster_pairs(session):
+    pairs = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Appointment):
+            pairs.add((obj.doctor_id, obj.patient_id))
+    for obj in session.dirty:
+        if isinstance(obj, Appointment):
+            attrs = inspect(obj).attrs
+            if not any(attrs[name].history.has_changes()
+                       for name in ('status', 'appointment_date', 'doctor_id', 'patient_id')):
+                continue
+            pairs.add((obj.doctor_id, obj.patient_id))
+            old_doctor_id = attrs.doctor_id.history.deleted
+            old_patient_id = attrs.patient_id.history.deleted
+            pairs.add((old_doctor_id[0] if old_doctor_id else obj.doctor_id,
+                       old_patient_id[0] if old_patient_id else obj.patient_id))
+    return pairs
+
+def roster_select(connection, doctor_id=None, patient_id=None):
+    tables = [Appointment.__table__] + [archive_tables(year)[0] for year in archive_years(connection)]
+    visits = []
+    for table in tables:
+        query = select(table.c.doctor_id, table.c.patient_id, table.c.appointment_date).where(
+            table.c.status != 'Cancelled'
+        )
+        if doctor_id is not None:
+            query = query.where(table.c.doctor_id == doctor_id, table.c.patient_id == patient_id)
+        visits.append(query)
+    visits = union_all(*visits).subquery() if len(visits) > 1 else visits[0].subquery()
+    return select(
+        visits.c.doctor_id,
+        visits.c.patient_id,
+        func.min(visits.c.appointment_date),
+        func.max(visits.c.appointment_date),
+        func.count()
+    ).group_by(visits.c.doctor_id, visits.c.patient_id)
+
+ROSTER_COLUMNS = ['doctor_id', 'patient_id', 'first_visit', 'last_visit', 'visit_count']
+
+def refresh_roster(connection, pairs):
+    for doctor_id, patient_id in pairs:
+        connection.execute(delete(DoctorPatient).where(
+            DoctorPatient.doctor_id == doctor_id,
+            DoctorPatient.patient_id == patient_id
+        ))
+        connection.execute(insert(DoctorPatient).from_select(
+            ROSTER_COLUMNS, roster_select(connection, doctor_id, patient_id)
+        ))
+
+def rebuild_roster(connection):
+    connection.execute(delete(DoctorPatient))
+    connection.execute(insert(DoctorPatient).from_select(ROSTER_COLUMNS, roster_select(connection)))
+
+@event.listens_for(Session, 'after_flush')
+def refresh_changed_rosters(session, flush_context):
+    pairs = roster_pairs(session)
+    if pairs:
+        refresh_roster(session.connection(), pairs)
+
+class TTLCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+    
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self.items[key]
+                return default
+            self.items.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.items[key] = (expires_at, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+    
+    def incr(self, key, ttl=None):
+        now = time.monotonic()
+        with self.lock:
+            item = self.items.get(key)
+            if item is None or item[0] < now:
+                item = (now + (self.ttl if ttl is None else ttl), 0)
+            item = (item[0], item[1] + 1)
+            self.items[key] = item
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+            return item[1]
+    
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+    
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+    
+    def __len__(self):
+        return len(self.items)
+
+identity_cache = TTLCache(app.config['IDENTITY_CACHE_SIZE'], app.config['IDENTITY_CACHE_TTL'])
+login_attempts = TTLCache(app.config['LOGIN_ATTEMPT_CACHE_SIZE'], app.config['LOGIN_ATTEMPT_WINDOW'])
+revoked_principals = TTLCache(app.config['IDENTITY_CACHE_SIZE'], app.config['PRINCIPAL_MAX_AGE'])
+
+class HashingBusy(Exception):
+    pass
+
+class PasswordHasher:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pending = 0
+    
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=app.config['HASH_WORKERS'])
+            return self.executor
+    
+    def run(self, func, *args):
+        with self.lock:
+            if self.pending >= app.config['HASH_QUEUE_LIMIT']:
+                raise HashingBusy()
+            self.pending += 1
+        try:
+            if app.config['HASH_WORKERS'] <= 0:
+                return func(*args)
+            return self.get_executor().submit(func, *args).result()
+        finally:
+            with self.lock:
+                self.pending -= 1
+    
+    def hash(self, password):
+        return self.run(generate_password_hash, password, app.config['PASSWORD_HASH_METHOD'])
+    
+    def verify(self, password_hash, password):
+        return self.run(check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != app.config['PASSWORD_HASH_METHOD']
+    
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+password_hasher = PasswordHasher()
+
+def login_attempt_keys(username):
+    return [
+        (('user', username), app.config['LOGIN_MAX_ATTEMPTS']),
+        (('ip', request.remote_addr), app.config['LOGIN_MAX_ATTEMPTS_PER_IP']),
+    ]
+
+def login_throttled(attempt_keys):
+    return any(login_attempts.get(key, 0) >= limit for key, limit in attempt_keys)
+
+def busy_response(template_name, message, status, **context):
+    flash(message, 'error')
+    return render_template(template_name, **context), status, {'Retry-After': str(app.config['HASH_RETRY_AFTER'])}
+
+def fetch_identity(user_id):
+    with Session(db.engine) as session:
+        user = session.get(User, user_id, options=[joinedload(User.doctor), joinedload(User.patient)])
+        session.expunge_all()
+    return user
+
+def load_identity(user_id):
+    user = identity_cache.get(user_id)
+    if user is None:
+        user = fetch_identity(user_id)
+        if user is None:
+            return None
+        identity_cache.set(user_id, user)
+    return db.session.merge(user, load=False)
+
+@event.listens_for(Session, 'after_flush')
+def collect_identity_changes(session, flush_context):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+        elif isinstance(obj, (Doctor, Patient)):
+            changed.add(obj.user_id)
+    if changed:
+        session.info.setdefault('identity_changes', set()).update(changed)
+    revoked = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    if revoked:
+        session.info.setdefault('principals_revoked', set()).update(revoked)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_identities(session):
+    for user_id in session.info.pop('identity_changes', ()):
+        identity_cache.delete(user_id)
+    for user_id in session.info.pop('principals_revoked', ()):
+        revoked_principals.set(user_id, True)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_identity_changes(session):
+    session.info.pop('identity_changes', None)
+    session.info.pop('principals_revoked', None)
+
+class Principal:
+    __slots__ = ('id', 'role', 'profile_id')
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+    
+    def __init__(self, id, role, profile_id):
+        self.id = id
+        self.role = role
+        self.profile_id = profile_id
+    
+    @classmethod
+    def from_user(cls, user):
+        profile = user.doctor if user.role == 'doctor' else user.patient if user.role == 'patient' else None
+        return cls(user.id, user.role, profile.id if profile is not None else None)
+    
+    def get_id(self):
+        return str(self.id)
+    
+    def load(self, fresh=False):
+        if fresh:
+            user = db.session.get(User, self.id, options=[joinedload(User.doctor), joinedload(User.patient)])
+        else:
+            user = load_identity(self.id)
+        if user is None:
+            logout_user()
+            session.pop('principal', None)
+            abort(login_manager.unauthorized())
+        return user
+    
+    @property
+    def user(self):
+        return self.load()
+    
+    @property
+    def doctor(self):
+        return self.user.doctor
+    
+    @property
+    def patient(self):
+        return self.user.patient
+
+def remember_principal(principal):
+    session['principal'] = (principal.id, principal.role, principal.profile_id, int(time.time()))
+
+def sign_in(user):
+    principal = Principal.from_user(user)
+    login_user(principal)
+    remember_principal(principal)
+    return principal
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    stored = session.get('principal')
+    if (stored and str(stored[0]) == user_id and time.time() - stored[3] < app.config['PRINCIPAL_MAX_AGE']
+            and revoked_principals.get(stored[0]) is None):
+        return Principal(*stored[:3])
+    user = fetch_identity(int(user_id))
+    if user is None:
+        identity_cache.delete(int(user_id))
+        session.pop('principal', None)
+        return None
+    identity_cache.set(user.id, user)
+    principal = Principal.from_user(user)
+    remember_principal(principal)
+    return principal
+
+class SQLiteSessionStore:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.pruned_at = 0
+        self.connection().execute(
+            'CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+    
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+    
+    def get(self, key, default=None):
+        row = self.connection().execute(
+            'SELECT data FROM sessions WHERE id = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return default if row is None else row[0]
+    
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        connection = self.connection()
+        connection.execute('INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)',
+                           (key, value, now + ttl))
+        if time.monotonic() - self.pruned_at > 3600:
+            self.pruned_at = time.monotonic()
+            connection.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+    
+    def delete(self, key):
+        self.connection().execute('DELETE FROM sessions WHERE id = ?', (key,))
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid or secrets.token_urlsafe(32)
+
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+    
+    def __init__(self, store):
+        self.store = store
+    
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSession(self.serializer.loads(data), sid)
+        return ServerSession()
+    
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not self.should_set_cookie(app, session):
+            return
+        if session.modified:
+            self.store.set(session.sid, self.serializer.dumps(dict(session)), app.config['SESSION_TTL'])
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+    
+    def rotate(self, session):
+        self.store.delete(session.sid)
+        session.sid = secrets.token_urlsafe(32)
+        session.modified = True
+
+@user_logged_in.connect_via(app)
+def rotate_session_id(sender, user):
+    if isinstance(app.session_interface, ServerSessionInterface):
+        app.session_interface.rotate(session._get_current_object())
+
+def configure_sessions():
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'cookie':
+        return
+    if backend == 'memory':
+        store = TTLCache(app.config['SESSION_MEMORY_SIZE'], app.config['SESSION_TTL'])
+    elif backend == 'sqlite':
+        path = app.config['SESSION_SQLITE_PATH']
+        if not path:
+            os.makedirs(app.instance_path, exist_ok=True)
+            path = os.path.join(app.instance_path, 'sessions.db')
+        store = SQLiteSessionStore(path)
+    else:
+        raise RuntimeError('Unknown SESSION_BACKEND %s' % backend)
+    app.session_interface = ServerSessionInterface(store)
+
+class LocalCache:
+    def __init__(self, max_size, ttl):
+        self.items = TTLCache(max_size, ttl)
+        self.pinned = {}
+        self.lock = threading.Lock()
+        self.counters = Counter()
+    
+    def get(self, key):
+        if key in self.pinned:
+            return self.pinned[key]
+        return self.items.get(key)
+    
+    def set(self, key, value, ttl):
+        if ttl is None:
+            self.pinned[key] = value
+        else:
+            self.items.set(key, value, ttl)
+    
+    def counter(self, key):
+        with self.lock:
+            return self.counters[key]
+    
+    def incr(self, key):
+        with self.lock:
+            self.counters[key] += 1
+            return self.counters[key]
+
+class RedisCache:
+    def __init__(self, url, prefix):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+    
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+    
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+    
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+    
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+class PageCache:
+    def __init__(self):
+        self.backend = None
+    
+    def configure(self):
+        if app.config['CACHE_BACKEND'] == 'redis':
+            if redis is None:
+                raise RuntimeError('CACHE_BACKEND=redis requires the redis package')
+            self.backend = RedisCache(app.config['CACHE_URL'], app.config['CACHE_KEY_PREFIX'])
+        else:
+            self.backend = LocalCache(app.config['CACHE_SIZE'], app.config['CACHE_TTL'])
+        if self.backend.get('modified') is None:
+            self.backend.set('modified', time.time(), None)
+    
+    def versions(self, *namespaces):
+        return tuple(self.backend.counter('version:' + namespace) for namespace in namespaces)
+    
+    def bump(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.incr('version:' + namespace)
+        self.backend.set('modified', time.time(), None)
+    
+    def last_modified(self):
+        modified = self.backend.get('modified')
+        return datetime.utcfromtimestamp(modified) if modified else None
+    
+    def fetch(self, key, namespaces, build):
+        versioned_key = '%s:%s' % (key, ':'.join(map(str, self.versions(*namespaces))))
+        value = self.backend.get(versioned_key)
+        if value is None:
+            value = build()
+            self.backend.set(versioned_key, value, app.config['CACHE_TTL'])
+        return value
+
+page_cache = PageCache()
+
+CACHED_MODELS = {Doctor: 'doctors', Department: 'departments'}
+
+@event.listens_for(Session, 'after_flush')
+def collect_cache_changes(session, flush_context):
+    namespaces = {
+        CACHED_MODELS[type(obj)]
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if type(obj) in CACHED_MODELS
+    }
+    if namespaces:
+        session.info.setdefault('cache_changes', set()).update(namespaces)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_cached_pages(session):
+    namespaces = session.info.pop('cache_changes', None)
+    if namespaces and page_cache.backend is not None:
+        page_cache.bump(*namespaces)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_cache_changes(session):
+    session.info.pop('cache_changes', None)
+
+def cached_departments():
+    return page_cache.fetch('departments', ('departments',), lambda: [
+        {'id': department.id, 'name': department.name, 'description': department.description}
+        for department in Department.query.order_by(Department.id)
+    ])
+
+def conditional_response(body, last_modified=None):
+    response = app.make_response(body)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.add_etag()
+    return response.make_conditional(request)
+
+RETIRED_INDEXES = ('ix_appointments_doctor_slot',)
+
+def migrate_indexes():
+    with db.engine.begin() as connection:
+        for name in RETIRED_INDEXES:
+            connection.exec_driver_sql('DROP INDEX IF EXISTS %s' % name)
+    failed = []
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+            except IntegrityError as exc:
+                app.logger.error('Could not create index %s: %s', index.name, exc.orig)
+                failed.append(index.name)
+    return failed
+
+def migrate_autoincrement():
+    if db.engine.dialect.name != 'sqlite':
+        return
+    metadata = MetaData()
+    for table in db.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    with db.engine.begin() as connection:
+        years = archive_years(connection)
+        for position, table in enumerate((Appointment.__table__, Treatment.__table__)):
+            definition = connection.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': table.name}).scalar()
+            if 'AUTOINCREMENT' not in definition.upper():
+                rebuilt = table.to_metadata(metadata, name=table.name + '_rebuild')
+                connection.execute(CreateTable(rebuilt))
+                columns = ', '.join(column['name'] for column in inspect(connection).get_columns(table.name)
+                                    if column['name'] in rebuilt.c)
+                connection.exec_driver_sql('INSERT INTO %s (%s) SELECT %s FROM %s' % (
+                    rebuilt.name, columns, columns, table.name))
+                connection.exec_driver_sql('DROP TABLE %s' % table.name)
+                connection.exec_driver_sql('ALTER TABLE %s RENAME TO %s' % (rebuilt.name, table.name))
+            highest = max([connection.execute(select(func.max(archive_tables(year)[position].c.id))).scalar() or 0
+                           for year in years] + [0])
+            if not connection.execute(text('UPDATE sqlite_sequence SET seq = max(seq, :seq) WHERE name = :name'),
+                                      {'seq': highest, 'name': table.name}).rowcount:
+                connection.execute(text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)'),
+                                   {'seq': highest, 'name': table.name})
+
+def migrate_duplicate_bookings():
+    table = Appointment.__table__
+    slot = (table.c.doctor_id, table.c.appointment_date, table.c.appointment_time)
+    active = table.c.status != 'Cancelled'
+    with db.engine.begin() as connection:
+        duplicated = select(*slot).where(active).group_by(*slot).having(func.count() > 1).subquery()
+        rows = connection.execute(
+            select(table.c.id, table.c.patient_id, *slot)
+            .join(duplicated, and_(*(column == duplicated.c[column.name] for column in slot)))
+            .where(active)
+            .order_by(*slot, table.c.created_at, table.c.id)
+        ).all()
+        kept = set()
+        cancelled = []
+        for row in rows:
+            key = (row.doctor_id, row.appointment_date, row.appointment_time)
+            if key in kept:
+                cancelled.append(row)
+            else:
+                kept.add(key)
+        if not cancelled:
+            return []
+        connection.execute(update(table).where(table.c.id.in_([row.id for row in cancelled])).values(status='Cancelled'))
+        refresh_roster(connection, {(row.doctor_id, row.patient_id) for row in cancelled})
+    ids = [row.id for row in cancelled]
+    app.logger.warning('Cancelled %d double-booked appointments before creating uq_appointments_active_slot: %s',
+                       len(ids), ', '.join(map(str, ids)))
+    return ids
+
+def migrate_slot_minutes():
+    tables = [Appointment.__table__]
+    with db.engine.begin() as connection:
+        tables += [archive_tables(year)[0] for year in archive_years(connection)]
+        for table in tables:
+            columns = {column['name'] for column in inspect(connection).get_columns(table.name)}
+            if 'slot_minute' not in columns:
+                connection.execute(text('ALTER TABLE %s ADD COLUMN slot_minute SMALLINT' % table.name))
+            times = connection.execute(select(table.c.appointment_time).where(
+                table.c.slot_minute.is_(None)
+            ).distinct()).scalars().all()
+            for appointment_time in times:
+                minute = parse_slot_minute(appointment_time)
+                if minute is not None:
+                    connection.execute(update(table).where(
+                        table.c.appointment_time == appointment_time,
+                        table.c.slot_minute.is_(None)
+                    ).values(slot_minute=minute))
+
+def migrate_roster():
+    with db.engine.begin() as connection:
+        if connection.execute(select(DoctorPatient.doctor_id).limit(1)).first():
+            return
+        if connection.execute(select(Appointment.id).limit(1)).first():
+            rebuild_roster(connection)
+
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+        full_name, phone, content='patients', content_rowid='id', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS patients_fts_insert AFTER INSERT ON patients BEGIN
+        INSERT INTO patients_fts(rowid, full_name, phone) VALUES (new.id, new.full_name, new.phone);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_fts_delete AFTER DELETE ON patients BEGIN
+        INSERT INTO patients_fts(patients_fts, rowid, full_name, phone) VALUES ('delete', old.id, old.full_name, old.phone);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_fts_update AFTER UPDATE OF full_name, phone ON patients BEGIN
+        INSERT INTO patients_fts(patients_fts, rowid, full_name, phone) VALUES ('delete', old.id, old.full_name, old.phone);
+        INSERT INTO patients_fts(rowid, full_name, phone) VALUES (new.id, new.full_name, new.phone);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS doctors_fts USING fts5(full_name, department, prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_fts_insert AFTER INSERT ON doctors BEGIN
+        INSERT INTO doctors_fts(rowid, full_name, department)
+        VALUES (new.id, new.full_name, (SELECT name FROM departments WHERE id = new.department_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_fts_delete AFTER DELETE ON doctors BEGIN
+        DELETE FROM doctors_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_fts_update AFTER UPDATE OF full_name, department_id ON doctors BEGIN
+        DELETE FROM doctors_fts WHERE rowid = old.id;
+        INSERT INTO doctors_fts(rowid, full_name, department)
+        VALUES (new.id, new.full_name, (SELECT name FROM departments WHERE id = new.department_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS departments_fts_update AFTER UPDATE OF name ON departments BEGIN
+        DELETE FROM doctors_fts WHERE rowid IN (SELECT id FROM doctors WHERE department_id = new.id);
+        INSERT INTO doctors_fts(rowid, full_name, department)
+        SELECT id, full_name, new.name FROM doctors WHERE department_id = new.id;
+    END""",
+]
+
+SEARCH_INDEX_REBUILD = {
+    'patients_fts': "INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')",
+    'doctors_fts': """INSERT INTO doctors_fts(rowid, full_name, department)
+        SELECT doctors.id, doctors.full_name, departments.name
+        FROM doctors LEFT JOIN departments ON departments.id = doctors.department_id""",
+}
+
+search_index = {'enabled': None}
+
+def ensure_search_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    
+    existing = set(connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('patients_fts', 'doctors_fts')"
+    )).scalars())
+    try:
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+    except OperationalError as exc:
+        app.logger.warning('Full-text search disabled: %s', exc.orig)
+        return False
+    
+    for table, statement in SEARCH_INDEX_REBUILD.items():
+        if table not in existing:
+            connection.execute(text(statement))
+    return True
+
+def search_enabled():
+    if search_index['enabled'] is None:
+        search_index['enabled'] = db.engine.dialect.name == 'sqlite' and db.session.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ('patients_fts', 'doctors_fts')"
+        )).scalar() == 2
+    return search_index['enabled']
+
+def fts_match_expression(search_query):
+    terms = re.findall(r'\w+', search_query)
+    return ' '.join('"%s"*' % term for term in terms)
+
+def search_patient_ids(search_query, limit):
+    match = fts_match_expression(search_query)
+    ids = []
+    if search_query.isdigit():
+        ids.append(int(search_query))
+    if match:
+        ids.extend(db.session.execute(text(
+            'SELECT rowid FROM patients_fts WHERE patients_fts MATCH :match ORDER BY rank LIMIT :limit'
+        ), {'match': match, 'limit': limit}).scalars())
+    return list(dict.fromkeys(ids))[:limit]
+
+def search_doctor_ids(search_query, limit, department_id=None):
+    match = fts_match_expression(search_query)
+    if not match:
+        return []
+    sql = ('SELECT doctors_fts.rowid FROM doctors_fts JOIN doctors ON doctors.id = doctors_fts.rowid '
+           'WHERE doctors_fts MATCH :match')
+    params = {'match': match, 'limit': limit}
+    if department_id:
+        sql += ' AND doctors.department_id = :department_id'
+        params['department_id'] = department_id
+    sql += ' ORDER BY doctors_fts.rank LIMIT :limit'
+    return list(db.session.execute(text(sql), params).scalars())
+
+def fetch_ranked(model, ids, *options):
+    rows = {row.id: row for row in model.query.options(*options).filter(model.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
+
+job_handlers = {}
+
+def job_handler(name):
+    def register(func):
+        job_handlers[name] = func
+        return func
+    return register
+
+def enqueue(name, payload, key=None, delay=0):
+    if key is not None and db.session.query(Job.id).filter_by(idempotency_key=key).first():
+        return None
+    job = Job(
+        name=name,
+        payload=json.dumps(payload),
+        idempotency_key=key,
+        max_attempts=app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job)
+    db.session.info['jobs_enqueued'] = True
+    return job
+
+@event.listens_for(Session, 'after_commit')
+def wake_job_workers(session):
+    if session.info.pop('jobs_enqueued', None):
+        job_queue.wake.set()
+
+@event.listens_for(Session, 'after_rollback')
+def discard_enqueued_jobs(session):
+    session.info.pop('jobs_enqueued', None)
+
+class JobQueue:
+    def __init__(self):
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.pruned_at = -float('inf')
+        self.recovered_at = -float('inf')
+    
+    def claim(self):
+        now = datetime.utcnow()
+        next_job = select(Job.id).where(Job.status == 'pending', Job.run_at <= now).order_by(
+            Job.run_at, Job.id
+        ).limit(1)
+        with db.engine.connect() as connection:
+            if connection.execute(next_job).first() is None:
+                return None
+        next_job = next_job.scalar_subquery()
+        with db.engine.begin() as connection:
+            return connection.execute(
+                update(Job).where(Job.id == next_job, Job.status == 'pending').values(
+                    status='running', attempts=Job.attempts + 1, locked_at=now
+                ).returning(Job.id, Job.name, Job.payload, Job.attempts, Job.max_attempts)
+            ).first()
+    
+    def finish(self, job, error=None):
+        if error is None:
+            values = {'status': 'done', 'last_error': None}
+        elif job.attempts >= job.max_attempts:
+            values = {'status': 'failed', 'last_error': error}
+        else:
+            delay = app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            values = {'status': 'pending', 'last_error': error,
+                      'run_at': datetime.utcnow() + timedelta(seconds=delay)}
+        with db.engine.begin() as connection:
+            connection.execute(update(Job).where(Job.id == job.id).values(locked_at=None, **values))
+    
+    def run_job(self, job):
+        handler = job_handlers.get(job.name)
+        try:
+            if handler is None:
+                raise LookupError('no handler registered for %s' % job.name)
+            handler(**json.loads(job.payload))
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            app.logger.exception('Job %d (%s) failed on attempt %d', job.id, job.name, job.attempts)
+            self.finish(job, '%s: %s' % (type(exc).__name__, exc))
+        else:
+            self.finish(job)
+    
+    def run_pending(self):
+        processed = 0
+        while not self.stopping.is_set():
+            with app.app_context():
+                job = self.claim()
+                if job is None:
+                    return processed
+                self.run_job(job)
+            processed += 1
+        return processed
+    
+    def recover(self):
+        if time.monotonic() - self.recovered_at < app.config['JOB_LEASE_SECONDS'] / 2:
+            return
+        self.recovered_at = time.monotonic()
+        now = datetime.utcnow()
+        expired = and_(
+            Job.status == 'running',
+            Job.locked_at < now - timedelta(seconds=app.config['JOB_LEASE_SECONDS'])
+        )
+        finished = or_(
+            and_(Job.status == 'done',
+                 Job.created_at < now - timedelta(days=app.config['JOB_RETENTION_DAYS'])),
+            and_(Job.status == 'failed',
+                 Job.created_at < now - timedelta(days=app.config['JOB_FAILED_RETENTION_DAYS']))
+        )
+        prune = time.monotonic() - self.pruned_at > 3600
+        with db.engine.connect() as connection:
+            has_expired = connection.execute(select(Job.id).where(expired).limit(1)).first() is not None
+            has_finished = prune and connection.execute(select(Job.id).where(finished).limit(1)).first() is not None
+        if prune:
+            self.pruned_at = time.monotonic()
+        if not has_expired and not has_finished:
+            return
+        with db.engine.begin() as connection:
+            if has_expired:
+                connection.execute(update(Job).where(expired).values(status='pending', locked_at=None))
+            if has_finished:
+                connection.execute(delete(Job).where(finished))
+    
+    def work(self):
+        while not self.stopping.is_set():
+            try:
+                with app.app_context():
+                    self.recover()
+                self.run_pending()
+            except OperationalError:
+                app.logger.exception('Job worker could not reach the database')
+            self.wake.wait(app.config['JOB_POLL_INTERVAL'])
+            self.wake.clear()
+    
+    def start(self, workers):
+        if self.threads:
+            return
+        self.stopping.clear()
+        self.threads = [threading.Thread(target=self.work, name='job-worker-%d' % n, daemon=True)
+                        for n in range(workers)]
+        for thread in self.threads:
+            thread.start()
+    
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+job_queue = JobQueue()
+
+@job_handler('appointment_notification')
+def send_appointment_notification(appointment_id, event):
+    appointment = db.session.get(Appointment, appointment_id)
+    if appointment is None:
+        return
+    app.logger.info('Appointment %d %s: %s with %s on %s at %s', appointment.id, event,
+                    appointment.patient.full_name, appointment.doctor.full_name,
+                    appointment.appointment_date.isoformat(), appointment.appointment_time)
+
+def enqueue_appointment_notification(appointment_id, event):
+    return enqueue('appointment_notification', {'appointment_id': appointment_id, 'event': event},
+                   key='appointment:%d:%s' % (appointment_id, event))
+
+class FeedBusy(Exception):
+    pass
+
+def cooperative_workers():
+    gevent = sys.modules.get('gevent.monkey')
+    return gevent is not None and gevent.is_module_patched('threading')
+
+def feed_streaming():
+    mode = app.config['EVENT_STREAMING']
+    return mode == 'on' or (mode == 'auto' and cooperative_workers())
+
+class FeedSubscription:
+    def __init__(self, doctor_id):
+        self.doctor_id = doctor_id
+        self.ready = threading.Event()
+
+class EventBroker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.connections = 0
+    
+    def subscribe(self, doctor_id):
+        with self.lock:
+            if self.connections >= app.config['EVENT_MAX_CONNECTIONS']:
+                raise FeedBusy()
+            subscription = FeedSubscription(doctor_id)
+            self.subscribers[doctor_id].add(subscription)
+            self.connections += 1
+            return subscription
+    
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.doctor_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.doctor_id]
+                self.connections -= 1
+    
+    def notify(self, doctor_ids):
+        with self.lock:
+            for doctor_id in doctor_ids:
+                for subscription in self.subscribers.get(doctor_id, ()):
+                    subscription.ready.set()
+
+event_broker = EventBroker()
+
+def appointment_event(doctor_id, name, appointment_id, appointment_date, appointment_time, status):
+    return {'doctor_id': doctor_id, 'name': name, 'payload': json.dumps({
+        'id': appointment_id,
+        'appointment_date': appointment_date.isoformat(),
+        'appointment_time': appointment_time,
+        'status': status,
+    })}
+
+feed_pruning = {'pruned_at': 0}
+
+def record_feed_events(connection, events):
+    now = datetime.utcnow()
+    connection.execute(insert(FeedEvent), [dict(event, created_at=now) for event in events])
+    if time.monotonic() - feed_pruning['pruned_at'] > 600:
+        feed_pruning['pruned_at'] = time.monotonic()
+        connection.execute(delete(FeedEvent).where(
+            FeedEvent.created_at < now - timedelta(seconds=app.config['EVENT_RETENTION_SECONDS'])
+        ))
+    return {event['doctor_id'] for event in events}
+
+def latest_feed_event_id(connection):
+    return connection.execute(select(func.max(FeedEvent.id))).scalar() or 0
+
+def read_feed(connection, doctor_id, last_id):
+    limit = app.config['EVENT_QUEUE_SIZE']
+    oldest = connection.execute(select(func.min(FeedEvent.id))).scalar()
+    rows = connection.execute(select(FeedEvent.id, FeedEvent.name, FeedEvent.payload).where(
+        FeedEvent.doctor_id == doctor_id, FeedEvent.id > last_id
+    ).order_by(FeedEvent.id).limit(limit + 1)).all()
+    if (oldest is not None and last_id < oldest - 1) or len(rows) > limit:
+        return [], True, latest_feed_event_id(connection)
+    return rows, False, rows[-1].id if rows else last_id
+
+def format_feed(rows, reset, last_id):
+    chunks = ['event: reset\ndata: {}\n\n'] if reset else []
+    chunks.extend('id: %d\nevent: %s\ndata: %s\n\n' % (row.id, row.name, row.payload) for row in rows)
+    if reset or not rows:
+        chunks.append('id: %d\n\n' % last_id)
+    return ''.join(chunks)
+
+def collect_appointment_events(session):
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Appointment) and obj.status == 'Booked':
+            events.append(appointment_event(obj.doctor_id, 'booked', obj.id, obj.appointment_date,
+                                            obj.appointment_time, obj.status))
+    for obj in session.dirty:
+        if not isinstance(obj, Appointment):
+            continue
+        state = inspect(obj)
+        status = state.attrs.status.history
+        doctor_id = state.attrs.doctor_id.history
+        if doctor_id.deleted and doctor_id.deleted[0] is not None:
+            events.append(appointment_event(doctor_id.deleted[0], 'rescheduled', obj.id, obj.appointment_date,
+                                            obj.appointment_time, obj.status))
+            events.append(appointment_event(obj.doctor_id, 'booked', obj.id, obj.appointment_date,
+                                            obj.appointment_time, obj.status))
+        elif status.has_changes() and obj.status in ('Completed', 'Cancelled'):
+            events.append(appointment_event(obj.doctor_id, obj.status.lower(), obj.id, obj.appointment_date,
+                                            obj.appointment_time, obj.status))
+    return events
+
+@event.listens_for(Session, 'after_flush')
+def collect_feed_events(session, flush_context):
+    events = collect_appointment_events(session)
+    if events:
+        doctor_ids = record_feed_events(session.connection(), events)
+        session.info.setdefault('feed_doctors', set()).update(doctor_ids)
+
+@event.listens_for(Session, 'after_commit')
+def publish_feed_events(session):
+    doctor_ids = session.info.pop('feed_doctors', None)
+    if doctor_ids:
+        event_broker.notify(doctor_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_feed_events(session):
+    session.info.pop('feed_doctors', None)
+
+SLOT_CONFLICT_MARKERS = (
+    'uq_appointments_active_slot',
+    'appointments.doctor_id, appointments.appointment_date, appointments.appointment_time',
+)
+
+def is_slot_conflict(exc):
+    message = str(exc.orig)
+    return any(marker in message for marker in SLOT_CONFLICT_MARKERS)
+
+def is_database_locked(exc):
+    return 'locked' in str(exc.orig).lower()
+
+def book_slot(patient_id, doctor_id, appointment_date, appointment_time, symptoms):
+    retries = app.config['BOOKING_RETRIES']
+    for attempt in range(retries):
+        appointment = Appointment(
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            symptoms=symptoms,
+            status='Booked'
+        )
+        db.session.add(appointment)
+        try:
+            db.session.flush()
+            enqueue_appointment_notification(appointment.id, 'booked')
+            db.session.commit()
+            availability.mark_booked(doctor_id, appointment_date, appointment_time)
+            return appointment
+        except IntegrityError as exc:
+            db.session.rollback()
+            if is_slot_conflict(exc):
+                availability.mark_booked(doctor_id, appointment_date, appointment_time)
+                return None
+            raise
+        except OperationalError as exc:
+            db.session.rollback()
+            if not is_database_locked(exc) or attempt == retries - 1:
+                raise
+            time.sleep(app.config['BOOKING_RETRY_DELAY'] * 2 ** attempt)
+
+BULK_RETURNING = (
+    Appointment.id,
+    Appointment.patient_id,
+    Appointment.appointment_date,
+    Appointment.appointment_time,
+)
+
+def booked_in_range(doctor_id, start, end):
+    return [
+        Appointment.doctor_id == doctor_id,
+        Appointment.status == 'Booked',
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date <= end,
+    ]
+
+def bulk_summary(action, rows, **extra):
+    summary = dict(extra, action=action, updated=len(rows), appointments=[{
+        'id': row.id,
+        'patient_id': row.patient_id,
+        'appointment_date': row.appointment_date.isoformat(),
+        'appointment_time': row.appointment_time,
+    } for row in rows])
+    for key, value in summary.items():
+        if isinstance(value, date):
+            summary[key] = value.isoformat()
+    return summary
+
+def bulk_cancel(doctor_id, start, end):
+    rows = db.session.execute(
+        update(Appointment).where(*booked_in_range(doctor_id, start, end)).values(
+            status='Cancelled'
+        ).returning(*BULK_RETURNING)
+    ).all()
+    refresh_roster(db.session.connection(), {(doctor_id, row.patient_id) for row in rows})
+    for row in rows:
+        enqueue_appointment_notification(row.id, 'cancelled')
+    notified = record_feed_events(db.session.connection(), [
+        appointment_event(doctor_id, 'cancelled', row.id, row.appointment_date, row.appointment_time, 'Cancelled')
+        for row in rows
+    ]) if rows else ()
+    db.session.commit()
+    
+    changes = []
+    for row in rows:
+        changes.append(('appointment_update', row.id, (doctor_id, 'Booked'), -1))
+        changes.append(('appointment_update', row.id, (doctor_id, 'Cancelled'), 1))
+        availability.mark_free(doctor_id, row.appointment_date, row.appointment_time)
+    stats.apply(changes)
+    event_broker.notify(notified)
+    return bulk_summary('cancel', rows, doctor_id=doctor_id, start=start, end=end, skipped=0)
+
+def bulk_reschedule(doctor_id, target_doctor_id, start, end):
+    target = db.session.get(Doctor, target_doctor_id)
+    weekdays = parse_available_days(target.available_days)
+    working_days = [start + timedelta(days=n) for n in range((end - start).days + 1)
+                    if (start + timedelta(days=n)).weekday() in weekdays]
+    
+    matched = db.session.query(func.count(Appointment.id)).filter(
+        *booked_in_range(doctor_id, start, end)
+    ).scalar()
+    other = aliased(Appointment)
+    taken = select(other.id).where(
+        other.doctor_id == target_doctor_id,
+        other.appointment_date == Appointment.appointment_date,
+        other.appointment_time == Appointment.appointment_time,
+        other.status != 'Cancelled'
+    ).exists()
+    try:
+        rows = db.session.execute(
+            update(Appointment).where(
+                *booked_in_range(doctor_id, start, end),
+                Appointment.appointment_date.in_(working_days),
+                ~taken
+            ).values(doctor_id=target_doctor_id).returning(*BULK_RETURNING)
+        ).all()
+        refresh_roster(db.session.connection(), {
+            (moved_doctor_id, row.patient_id) for row in rows for moved_doctor_id in (doctor_id, target_doctor_id)
+        })
+        for row in rows:
+            enqueue('appointment_notification', {'appointment_id': row.id, 'event': 'rescheduled'})
+        notified = record_feed_events(db.session.connection(), [
+            appointment_event(moved_doctor_id, name, row.id, row.appointment_date, row.appointment_time, 'Booked')
+            for row in rows
+            for moved_doctor_id, name in ((doctor_id, 'rescheduled'), (target_doctor_id, 'booked'))
+        ]) if rows else ()
+        db.session.commit()
+    except IntegrityError as exc:
+        db.session.rollback()
+        if is_slot_conflict(exc):
+            availability.invalidate(target_doctor_id)
+            return None
+        raise
+    
+    changes = []
+    for row in rows:
+        changes.append(('appointment_update', row.id, (doctor_id, 'Booked'), -1))
+        changes.append(('appointment_update', row.id, (target_doctor_id, 'Booked'), 1))
+        availability.mark_free(doctor_id, row.appointment_date, row.appointment_time)
+        availability.mark_booked(target_doctor_id, row.appointment_date, row.appointment_time)
+    stats.apply(changes)
+    event_broker.notify(notified)
+    return bulk_summary('reschedule', rows, doctor_id=doctor_id, target_doctor_id=target_doctor_id,
+                        start=start, end=end, skipped=matched - len(rows))
+
+def bulk_request_values():
+    values = request.get_json(silent=True) or request.form
+    if not hasattr(values, 'get'):
+        raise ValueError('expected an object')
+    start = datetime.strptime(values.get('start', ''), '%Y-%m-%d').date()
+    end = datetime.strptime(values.get('end', ''), '%Y-%m-%d').date()
+    if end < start:
+        raise ValueError('end is before start')
+    if (end - start).days >= app.config['BULK_MAX_DAYS']:
+        raise ValueError('range is longer than %d days' % app.config['BULK_MAX_DAYS'])
+    return values, start, end
+
+def wants_json():
+    return request.is_json or request.accept_mimetypes.best == 'application/json'
+
+def bulk_error(message, endpoint, status=400):
+    if wants_json():
+        return jsonify({'error': message}), status
+    flash(message, 'error')
+    return redirect(url_for(endpoint))
+
+def bulk_response(summary, endpoint):
+    if wants_json():
+        return jsonify(summary)
+    message = '%d appointments %s' % (summary['updated'], 'cancelled' if summary['action'] == 'cancel' else 'rescheduled')
+    if summary['skipped']:
+        message += ', %d skipped because the other doctor is booked or not working that day' % summary['skipped']
+    flash(message, 'success')
+    return redirect(url_for(endpoint))
+
+def engine_options(database_uri):
+    if database_uri.startswith('sqlite'):
+        if database_uri in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        return {
+            'pool_size': app.config['DB_POOL_SIZE'],
+            'max_overflow': app.config['DB_MAX_OVERFLOW'],
+            'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        }
+    return {
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        'pool_recycle': app.config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=%s' % app.config['SQLITE_JOURNAL_MODE'])
+    cursor.execute('PRAGMA synchronous=%s' % app.config['SQLITE_SYNCHRONOUS'])
+    cursor.execute('PRAGMA busy_timeout=%d' % app.config['SQLITE_BUSY_TIMEOUT'])
+    cursor.execute('PRAGMA mmap_size=%d' % app.config['SQLITE_MMAP_SIZE'])
+    cursor.close()
+
+SCHEMA_VERSION = 4
+
+DEFAULT_DEPARTMENTS = [
+    {'name': 'Cardiology', 'description': 'Heart and cardiovascular system'},
+    {'name': 'Neurology', 'description': 'Brain and nervous system'},
+    {'name': 'Orthopedics', 'description': 'Bones, joints, and muscles'},
+    {'name': 'Pediatrics', 'description': 'Children healthcare'},
+    {'name': 'Dermatology', 'description': 'Skin conditions'},
+    {'name': 'General Medicine', 'description': 'General health consultation'}
+]
+
+def insert_ignoring_conflicts(connection, model, rows):
+    if connection.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        for row in rows:
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(model).values(row))
+            except IntegrityError:
+                pass
+        return
+    connection.execute(dialect_insert(model).values(rows).on_conflict_do_nothing())
+
+def current_schema_version():
+    try:
+        with db.engine.connect() as connection:
+            return connection.execute(select(func.max(SchemaVersion.__table__.c.version))).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+def seed_defaults(connection):
+    now = datetime.utcnow()
+    if connection.execute(select(User.id).where(User.username == 'admin')).first() is None:
+        insert_ignoring_conflicts(connection, User, [{
+            'username': 'admin',
+            'email': 'admin@hospital.com',
+            'password_hash': generate_password_hash('admin123', app.config['PASSWORD_HASH_METHOD']),
+            'role': 'admin',
+            'created_at': now,
+        }])
+    insert_ignoring_conflicts(connection, Department, [
+        dict(department, created_at=now) for department in DEFAULT_DEPARTMENTS
+    ])
 
 def init_database():
     with app.app_context():
-        db.create_all()
-        
-        admin = User.query.filter_by(username='admin').first()
-        if not admin:
-            admin = User(
-                username='admin',
-                email='admin@hospital.com',
-                password_hash=generate_password_hash('admin123'),
-                role='admin'
-            )
-            db.session.add(admin)
-            db.session.commit()
-        
-        departments_list = [
-            {'name': 'Cardiology', 'description': 'Heart and cardiovascular system'},
-            {'name': 'Neurology', 'description': 'Brain and nervous system'},
-            {'name': 'Orthopedics', 'description': 'Bones, joints, and muscles'},
-            {'name': 'Pediatrics', 'description': 'Children healthcare'},
-            {'name': 'Dermatology', 'description': 'Skin conditions'},
-            {'name': 'General Medicine', 'description': 'General health consultation'}
-        ]
-        
-        for dept_data in departments_list:
-            dept = Department.query.filter_by(name=dept_data['name']).first()
-            if not dept:
-                dept = Department(name=dept_data['name'], description=dept_data['description'])
-                db.session.add(dept)
+        if current_schema_version() == SCHEMA_VERSION:
+            search_index['enabled'] = None
+            return
         
-        db.session.commit()
+        db.create_all()
+        migrate_slot_minutes()
+        migrate_autoincrement()
+        migrate_duplicate_bookings()
+        failed_indexes = migrate_indexes()
+        migrate_roster()
+        with db.engine.begin() as connection:
+            search_index['enabled'] = ensure_search_index(connection)
+            seed_defaults(connection)
+            if failed_indexes:
+                app.logger.error('Schema version not recorded; indexes %s will be retried on the next start',
+                                 ', '.join(failed_indexes))
+            else:
+                insert_ignoring_conflicts(connection, SchemaVersion, [
+                    {'version': SCHEMA_VERSION, 'applied_at': datetime.utcnow()}
+                ])
+        stats.invalidate()
+        page_cache.bump('departments')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+class RequestMetrics:
+    HISTOGRAMS = {
+        'hms_request_duration_seconds': ('Wall time per request.', LATENCY_BUCKETS),
+        'hms_template_render_seconds': ('Template render time per request.', LATENCY_BUCKETS),
+        'hms_sql_queries_per_request': ('SQL statements executed per request.', QUERY_COUNT_BUCKETS),
+        'hms_sql_duration_seconds': ('Time spent in SQL per request.', LATENCY_BUCKETS),
+    }
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in self.HISTOGRAMS}
+        self.requests = Counter()
+    
+    def observe(self, endpoint, status, values):
+        with self.lock:
+            self.requests[(endpoint, status)] += 1
+            for name, value in values.items():
+                histogram = self.histograms[name].get(endpoint)
+                if histogram is None:
+                    histogram = self.histograms[name][endpoint] = Histogram(self.HISTOGRAMS[name][1])
+                histogram.observe(value)
+    
+    def render(self):
+        lines = ['# HELP hms_requests_total Requests handled.', '# TYPE hms_requests_total counter']
+        with self.lock:
+            for (endpoint, status), count in sorted(self.requests.items()):
+                lines.append('hms_requests_total{endpoint="%s",status="%d"} %d' % (endpoint, status, count))
+            for name, (description, buckets) in self.HISTOGRAMS.items():
+                lines.append('# HELP %s %s' % (name, description))
+                lines.append('# TYPE %s histogram' % name)
+                for endpoint, histogram in sorted(self.histograms[name].items()):
+                    for bound, count in zip(buckets, histogram.counts):
+                        lines.append('%s_bucket{endpoint="%s",le="%g"} %d' % (name, endpoint, bound, count))
+                    lines.append('%s_bucket{endpoint="%s",le="+Inf"} %d' % (name, endpoint, histogram.count))
+                    lines.append('%s_sum{endpoint="%s"} %.6f' % (name, endpoint, histogram.sum))
+                    lines.append('%s_count{endpoint="%s"} %d' % (name, endpoint, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+def start_request_profile():
+    g.profile = {'started': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0, 'template_time': 0.0}
+
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    wall_time = time.perf_counter() - profile['started']
+    request_metrics.observe(request.endpoint or 'unmatched', response.status_code, {
+        'hms_request_duration_seconds': wall_time,
+        'hms_template_render_seconds': profile['template_time'],
+        'hms_sql_queries_per_request': profile['sql_count'],
+        'hms_sql_duration_seconds': profile['sql_time'],
+    })
+    response.headers['Server-Timing'] = 'app;dur=%.1f, db;dur=%.1f;desc="%d queries", tpl;dur=%.1f' % (
+        wall_time * 1000, profile['sql_time'] * 1000, profile['sql_count'], profile['template_time'] * 1000)
+    return response
+
+def start_template_timer(sender, template, context, **extra):
+    if 'profile' in g:
+        g.profile['template_started'] = time.perf_counter()
+
+def stop_template_timer(sender, template, context, **extra):
+    if 'profile' in g and 'template_started' in g.profile:
+        g.profile['template_time'] += time.perf_counter() - g.profile.pop('template_started')
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_started
+    in_request = has_request_context()
+    if in_request and 'profile' in g:
+        g.profile['sql_count'] += 1
+        g.profile['sql_time'] += elapsed
+    slow_query_ms = app.config['SLOW_QUERY_MS']
+    if slow_query_ms and elapsed * 1000 >= slow_query_ms:
+        app.logger.warning('Slow query (%.1f ms) in %s: %s %r', elapsed * 1000,
+                           request.endpoint if in_request else 'background', statement, parameters)
+
+def init_profiling():
+    with app.app_context():
+        engine = db.engine
+    if app.config['PROFILING_ENABLED'] or app.config['SLOW_QUERY_MS']:
+        event.listen(engine, 'before_cursor_execute', start_query_timer)
+        event.listen(engine, 'after_cursor_execute', stop_query_timer)
+    if app.config['PROFILING_ENABLED']:
+        app.before_request(start_request_profile)
+        app.after_request(finish_request_profile)
+        before_render_template.connect(start_template_timer, app)
+        template_rendered.connect(stop_template_timer, app)
+
+def configure_proxies():
+    hops = app.config['TRUSTED_PROXIES']
+    wsgi_app = app.wsgi_app.app if isinstance(app.wsgi_app, ProxyFix) else app.wsgi_app
+    app.wsgi_app = ProxyFix(wsgi_app, x_for=hops, x_proto=hops) if hops > 0 else wsgi_app
+
+def create_app(config=None):
+    if config:
+        app.config.update(config)
+    if 'sqlalchemy' not in app.extensions:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                              engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+        db.init_app(app)
+        init_profiling()
+    page_cache.configure()
+    configure_proxies()
+    configure_sessions()
+    init_database()
+    if app.config['JOB_WORKERS'] > 0:
+        job_queue.start(app.config['JOB_WORKERS'])
+    return app
+
+@app.route('/metrics')
+def metrics():
+    if not app.config['PROFILING_ENABLED']:
+        abort(404)
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != 'Bearer %s' % token:
+        abort(401)
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return conditional_response(render_template('index.html'))
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -137,13 +2197,31 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
+        attempt_keys = login_attempt_keys(username)
+        if login_throttled(attempt_keys):
+            return busy_response('login.html', 'Too many login attempts. Please try again later.', 429)
+        
         user = User.query.filter_by(username=username).first()
         
-        if user and check_password_hash(user.password_hash, password):
-            login_user(user)
+        try:
+            valid = user is not None and password_hasher.verify(user.password_hash, password)
+        except HashingBusy:
+            return busy_response('login.html', 'The server is busy. Please try again in a moment.', 503)
+        
+        if valid:
+            login_attempts.delete(attempt_keys[0][0])
+            if password_hasher.needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = password_hasher.hash(password)
+                    db.session.commit()
+                except HashingBusy:
+                    pass
+            sign_in(user)
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard'))
         else:
+            for key, limit in attempt_keys:
+                login_attempts.incr(key)
             flash('Invalid username or password', 'error')
     
     return render_template('login.html')
@@ -173,10 +2251,15 @@ def register():
             flash('Email already registered', 'error')
             return redirect(url_for('register'))
         
+        try:
+            password_hash = password_hasher.hash(password)
+        except HashingBusy:
+            return busy_response('register.html', 'The server is busy. Please try again in a moment.', 503)
+        
         user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hash,
             role='patient'
         )
         db.session.add(user)
@@ -204,6 +2287,7 @@ def register():
 @login_required
 def logout():
     logout_user()
+    session.pop('principal', None)
     flash('Logged out successfully', 'success')
     return redirect(url_for('index'))
 
@@ -224,16 +2308,29 @@ def admin_dashboard():
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    total_doctors = Doctor.query.count()
-    total_patients = Patient.query.count()
-    total_appointments = Appointment.query.count()
+    snapshot = stats.snapshot()
     
-    recent_appointments = Appointment.query.order_by(Appointment.created_at.desc()).limit(10).all()
+    recent_ids = snapshot['recent_ids']
+    recent_by_id = {
+        appointment.id: appointment
+        for appointment in Appointment.query.options(*appointment_listing_options()).filter(
+            Appointment.id.in_(recent_ids)
+        )
+    }
+    recent_appointments = [recent_by_id[i] for i in recent_ids if i in recent_by_id]
+    
+    departments = Department.query.order_by(Department.name).all()
+    department_counts = [
+        (department, snapshot['by_department'].get(department.id, 0))
+        for department in departments
+    ]
     
     return render_template('admin/dashboard.html', 
-                         total_doctors=total_doctors,
-                         total_patients=total_patients,
-                         total_appointments=total_appointments,
+                         total_doctors=snapshot['totals']['doctors'],
+                         total_patients=snapshot['totals']['patients'],
+                         total_appointments=snapshot['totals']['appointments'],
+                         status_counts=sorted(snapshot['by_status'].items()),
+                         department_counts=department_counts,
                          recent_appointments=recent_appointments)
 
 @app.route('/admin/doctors')
@@ -244,16 +2341,28 @@ def admin_doctors():
         return redirect(url_for('dashboard'))
     
     search_query = request.args.get('search', '')
+    per_page = get_page_size()
+    
+    if search_query and search_enabled():
+        doctors = fetch_ranked(Doctor, search_doctor_ids(search_query, per_page), joinedload(Doctor.department))
+        return render_template('admin/doctors.html', doctors=doctors, next_cursor=None, per_page=per_page,
+                               search_query=search_query)
+    
+    query = Doctor.query.options(joinedload(Doctor.department))
     
     if search_query:
-        doctors = Doctor.query.filter(
+        query = query.filter(
             (Doctor.full_name.contains(search_query)) |
             (Department.name.contains(search_query))
-        ).join(Department).all()
-    else:
-        doctors = Doctor.query.all()
+        ).join(Department)
+    
+    after = after_id_filter(Doctor.id)
+    if after is not None:
+        query = query.filter(after)
     
-    return render_template('admin/doctors.html', doctors=doctors, search_query=search_query)
+    query = query.order_by(Doctor.id)
+    return render_listing('admin/doctors.html', 'doctors', query, per_page, lambda doctor: doctor.id,
+                          search_query=search_query)
 
 @app.route('/admin/doctor/add', methods=['GET', 'POST'])
 @login_required
@@ -278,10 +2387,16 @@ def admin_add_doctor():
             flash('Username already exists', 'error')
             return redirect(url_for('admin_add_doctor'))
         
+        try:
+            password_hash = password_hasher.hash(password)
+        except HashingBusy:
+            return busy_response('admin/add_doctor.html', 'The server is busy. Please try again in a moment.', 503,
+                                 departments=cached_departments())
+        
         user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hash,
             role='doctor'
         )
         db.session.add(user)
@@ -303,7 +2418,7 @@ def admin_add_doctor():
         flash('Doctor added successfully!', 'success')
         return redirect(url_for('admin_doctors'))
     
-    departments = Department.query.all()
+    departments = cached_departments()
     return render_template('admin/add_doctor.html', departments=departments)
 
 @app.route('/admin/doctor/edit/<int:id>', methods=['GET', 'POST'])
@@ -332,10 +2447,11 @@ def admin_edit_doctor(id):
             doctor.user.email = email
         
         db.session.commit()
+        availability.invalidate(doctor.id)
         flash('Doctor updated successfully!', 'success')
         return redirect(url_for('admin_doctors'))
     
-    departments = Department.query.all()
+    departments = cached_departments()
     return render_template('admin/edit_doctor.html', doctor=doctor, departments=departments)
 
 @app.route('/admin/doctor/delete/<int:id>')
@@ -351,6 +2467,7 @@ def admin_delete_doctor(id):
     db.session.delete(doctor)
     db.session.delete(user)
     db.session.commit()
+    availability.invalidate(id)
     
     flash('Doctor removed successfully!', 'success')
     return redirect(url_for('admin_doctors'))
@@ -363,17 +2480,29 @@ def admin_patients():
         return redirect(url_for('dashboard'))
     
     search_query = request.args.get('search', '')
+    per_page = get_page_size()
+    
+    if search_query and search_enabled():
+        patients = fetch_ranked(Patient, search_patient_ids(search_query, per_page), joinedload(Patient.user))
+        return render_template('admin/patients.html', patients=patients, next_cursor=None, per_page=per_page,
+                               search_query=search_query)
+    
+    query = Patient.query.options(joinedload(Patient.user))
     
     if search_query:
-        patients = Patient.query.filter(
+        query = query.filter(
             (Patient.full_name.contains(search_query)) |
             (Patient.phone.contains(search_query)) |
             (Patient.id == int(search_query) if search_query.isdigit() else False)
-        ).all()
-    else:
-        patients = Patient.query.all()
+        )
     
-    return render_template('admin/patients.html', patients=patients, search_query=search_query)
+    after = after_id_filter(Patient.id)
+    if after is not None:
+        query = query.filter(after)
+    
+    query = query.order_by(Patient.id)
+    return render_listing('admin/patients.html', 'patients', query, per_page, lambda patient: patient.id,
+                          search_query=search_query)
 
 @app.route('/admin/patient/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -426,36 +2555,294 @@ def admin_appointments():
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    appointments = Appointment.query.order_by(Appointment.appointment_date.desc()).all()
-    return render_template('admin/appointments.html', appointments=appointments)
+    per_page = get_page_size()
+    
+    query = Appointment.query.options(*appointment_listing_options())
+    
+    after = appointment_cursor_filter()
+    if after is not None:
+        query = query.filter(after)
+    
+    query = query.order_by(Appointment.appointment_date.desc(), Appointment.id.desc())
+    return render_listing('admin/appointments.html', 'appointments', query, per_page, appointment_cursor)
+
+@app.route('/admin/appointments/cancel', methods=['POST'])
+@login_required
+def admin_bulk_cancel():
+    if current_user.role != 'admin':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    try:
+        values, start, end = bulk_request_values()
+        doctor_id = int(values.get('doctor_id', ''))
+    except (TypeError, ValueError):
+        return bulk_error('doctor_id, start and end (YYYY-MM-DD, at most %d days apart) are required'
+                          % app.config['BULK_MAX_DAYS'], 'admin_appointments')
+    if db.session.get(Doctor, doctor_id) is None:
+        return bulk_error('Doctor not found', 'admin_appointments', 404)
+    
+    summary = bulk_cancel(doctor_id, start, end)
+    return bulk_response(summary, 'admin_appointments')
 
-@app.route('/doctor/dashboard')
+@app.route('/admin/appointments/reschedule', methods=['POST'])
 @login_required
-def doctor_dashboard():
-    if current_user.role != 'doctor':
+def admin_bulk_reschedule():
+    if current_user.role != 'admin':
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    doctor = Doctor.query.filter_by(user_id=current_user.id).first()
+    try:
+        values, start, end = bulk_request_values()
+        doctor_id = int(values.get('doctor_id', ''))
+        target_doctor_id = int(values.get('target_doctor_id', ''))
+    except (TypeError, ValueError):
+        return bulk_error('doctor_id, target_doctor_id, start and end (YYYY-MM-DD, at most %d days apart) are required'
+                          % app.config['BULK_MAX_DAYS'], 'admin_appointments')
+    if doctor_id == target_doctor_id:
+        return bulk_error('Choose a different doctor to reschedule to', 'admin_appointments')
+    if db.session.get(Doctor, doctor_id) is None or db.session.get(Doctor, target_doctor_id) is None:
+        return bulk_error('Doctor not found', 'admin_appointments', 404)
+    
+    summary = bulk_reschedule(doctor_id, target_doctor_id, start, end)
+    if summary is None:
+        return bulk_error('One of the target doctor\'s slots was booked while rescheduling. Nothing was changed; '
+                          'please try again.', 'admin_appointments', 409)
+    return bulk_response(summary, 'admin_appointments')
+
+def export_filters():
+    start = request.args.get('start')
+    end = request.args.get('end')
+    status = request.args.get('status')
+    start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+    end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    
+    def criteria(appointments):
+        filters = []
+        if start:
+            filters.append(appointments.c.appointment_date >= start)
+        if end:
+            filters.append(appointments.c.appointment_date <= end)
+        if status:
+            filters.append(appointments.c.status == status)
+        return filters
+    return start, end, criteria
+
+def export_sources(start, end):
+    return [(Appointment.__table__, Treatment.__table__)] + [
+        archive_tables(year) for year in archive_years(db.session)
+        if (start is None or year >= start.year) and (end is None or year <= end.year)
+    ]
+
+def appointment_export_query(appointments, treatments, criteria):
+    patient = Patient.__table__
+    doctor = Doctor.__table__
+    department = Department.__table__
+    return select(
+        appointments.c.id,
+        appointments.c.appointment_date,
+        appointments.c.appointment_time,
+        appointments.c.status,
+        appointments.c.patient_id,
+        patient.c.full_name.label('patient_name'),
+        appointments.c.doctor_id,
+        doctor.c.full_name.label('doctor_name'),
+        department.c.name.label('department'),
+        appointments.c.symptoms,
+        appointments.c.created_at,
+    ).select_from(appointments).join(
+        patient, patient.c.id == appointments.c.patient_id
+    ).join(
+        doctor, doctor.c.id == appointments.c.doctor_id
+    ).join(
+        department, department.c.id == doctor.c.department_id
+    ).where(*criteria(appointments)).order_by(appointments.c.appointment_date, appointments.c.id)
+
+def treatment_export_query(appointments, treatments, criteria):
+    patient = Patient.__table__
+    doctor = Doctor.__table__
+    return select(
+        treatments.c.id,
+        treatments.c.appointment_id,
+        appointments.c.appointment_date,
+        appointments.c.appointment_time,
+        appointments.c.patient_id,
+        patient.c.full_name.label('patient_name'),
+        appointments.c.doctor_id,
+        doctor.c.full_name.label('doctor_name'),
+        treatments.c.diagnosis,
+        treatments.c.prescription,
+        treatments.c.notes,
+        treatments.c.created_at,
+    ).select_from(treatments).join(
+        appointments, appointments.c.id == treatments.c.appointment_id
+    ).join(
+        patient, patient.c.id == appointments.c.patient_id
+    ).join(
+        doctor, doctor.c.id == appointments.c.doctor_id
+    ).where(*criteria(appointments)).order_by(appointments.c.appointment_date, treatments.c.id)
+
+def export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def generate_export(statements, file_format):
+    batch_size = app.config['EXPORT_YIELD_PER']
+    results = [db.session.execute(statement, execution_options={'yield_per': batch_size})
+               for statement in statements]
+    columns = list(results[0].keys())
+    merged = heapq.merge(*results, key=lambda row: (row.appointment_date, row.id))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    if file_format == 'csv':
+        writer.writerow(columns)
+    for rows in iter(lambda: list(islice(merged, batch_size)), []):
+        for row in rows:
+            if file_format == 'csv':
+                writer.writerow([export_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, map(export_value, row)))))
+                buffer.write('\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_response(name, build_query):
+    file_format = request.args.get('format', 'csv')
+    if file_format not in ('csv', 'ndjson'):
+        return Response('format must be csv or ndjson\n', status=400, mimetype='text/plain')
+    try:
+        start, end, criteria = export_filters()
+    except ValueError:
+        return Response('start and end must be YYYY-MM-DD\n', status=400, mimetype='text/plain')
+    statements = [build_query(appointments, treatments, criteria)
+                  for appointments, treatments in export_sources(start, end)]
+    
+    mimetype = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    filename = '%s-%s.%s' % (name, date.today().strftime('%Y%m%d'), file_format)
+    return Response(
+        stream_with_context(generate_export(statements, file_format)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': 'attachment; filename=%s' % filename}
+    )
+
+@app.route('/admin/export/appointments')
+@login_required
+def admin_export_appointments():
+    if current_user.role != 'admin':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
     
-    today = date.today()
-    next_week = today + timedelta(days=7)
+    return export_response('appointments', appointment_export_query)
+
+@app.route('/admin/export/treatments')
+@login_required
+def admin_export_treatments():
+    if current_user.role != 'admin':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
     
-    upcoming_appointments = Appointment.query.filter(
-        Appointment.doctor_id == doctor.id,
+    return export_response('treatments', treatment_export_query)
+
+def upcoming_for_doctor(doctor_id):
+    today = date.today()
+    return Appointment.query.options(*appointment_listing_options()).filter(
+        Appointment.doctor_id == doctor_id,
         Appointment.appointment_date >= today,
-        Appointment.appointment_date <= next_week,
+        Appointment.appointment_date <= today + timedelta(days=7),
         Appointment.status == 'Booked'
-    ).order_by(Appointment.appointment_date, Appointment.appointment_time).all()
+    ).order_by(Appointment.appointment_date, Appointment.slot_minute).all()
+
+@app.route('/doctor/dashboard')
+@login_required
+def doctor_dashboard():
+    if current_user.role != 'doctor':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
     
-    patients_list = Patient.query.join(Appointment).filter(
-        Appointment.doctor_id == doctor.id
-    ).distinct().all()
+    doctor = current_user.doctor
+    feed_cursor = latest_feed_event_id(db.session)
+    upcoming_appointments = upcoming_for_doctor(doctor.id)
+    
+    now = datetime.now()
+    next_appointments = appointments_between(doctor.id, now, now + timedelta(hours=2)).all()
+    
+    total_patients = db.session.query(func.count(DoctorPatient.patient_id)).filter(
+        DoctorPatient.doctor_id == doctor.id
+    ).scalar()
+    
+    query = DoctorPatient.query.options(joinedload(DoctorPatient.patient)).filter(
+        DoctorPatient.doctor_id == doctor.id
+    )
+    after = date_cursor_filter(DoctorPatient.last_visit, DoctorPatient.patient_id)
+    if after is not None:
+        query = query.filter(after)
+    query = query.order_by(DoctorPatient.last_visit.desc(), DoctorPatient.patient_id.desc())
+    
+    return render_listing('doctor/dashboard.html', 'roster', query, get_page_size(), roster_cursor,
+                          doctor=doctor,
+                          upcoming_appointments=upcoming_appointments,
+                          feed_cursor=feed_cursor,
+                          next_appointments=next_appointments,
+                          total_patients=total_patients)
+
+@app.route('/doctor/dashboard/upcoming')
+@login_required
+def doctor_upcoming():
+    if current_user.role != 'doctor':
+        return jsonify({'error': 'Access denied'}), 403
     
-    return render_template('doctor/dashboard.html', 
-                         doctor=doctor,
-                         upcoming_appointments=upcoming_appointments,
-                         patients=patients_list)
+    return render_template('doctor/_upcoming_rows.html',
+                           upcoming_appointments=upcoming_for_doctor(current_user.profile_id))
+
+def feed_stream(subscription, last_id):
+    poll = app.config['EVENT_POLL_SECONDS']
+    yield 'retry: %d\n\n' % (poll * 1000)
+    deadline = time.monotonic() + app.config['EVENT_STREAM_SECONDS']
+    sent_at = time.monotonic()
+    while True:
+        with app.app_context(), db.engine.connect() as connection:
+            rows, reset, last_id = read_feed(connection, subscription.doctor_id, last_id)
+        if rows or reset:
+            yield format_feed(rows, reset, last_id)
+            sent_at = time.monotonic()
+        elif time.monotonic() - sent_at >= app.config['EVENT_HEARTBEAT']:
+            yield ': keepalive\n\n'
+            sent_at = time.monotonic()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        subscription.ready.wait(min(poll, remaining))
+        subscription.ready.clear()
+
+@app.route('/doctor/events')
+@login_required
+def doctor_events():
+    if current_user.role != 'doctor':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('after')
+    if last_id is None or not last_id.isdigit():
+        last_id = latest_feed_event_id(db.session)
+    last_id = int(last_id)
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    
+    if not feed_streaming():
+        rows, reset, last_id = read_feed(db.session, current_user.profile_id, last_id)
+        body = 'retry: %d\n\n' % (app.config['EVENT_POLL_SECONDS'] * 1000) + format_feed(rows, reset, last_id)
+        return Response(body, mimetype='text/event-stream', headers=headers)
+    
+    try:
+        subscription = event_broker.subscribe(current_user.profile_id)
+    except FeedBusy:
+        return jsonify({'error': 'Too many open feeds'}), 503, {'Retry-After': '30'}
+    response = Response(feed_stream(subscription, last_id), mimetype='text/event-stream', headers=headers)
+    response.call_on_close(lambda: event_broker.unsubscribe(subscription))
+    return response
 
 @app.route('/doctor/appointments')
 @login_required
@@ -464,8 +2851,9 @@ def doctor_appointments():
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    doctor = Doctor.query.filter_by(user_id=current_user.id).first()
-    appointments = Appointment.query.filter_by(doctor_id=doctor.id).order_by(
+    appointments = Appointment.query.options(*appointment_listing_options()).filter_by(
+        doctor_id=current_user.profile_id
+    ).order_by(
         Appointment.appointment_date.desc()
     ).all()
     
@@ -479,9 +2867,8 @@ def doctor_complete_appointment(id):
         return redirect(url_for('dashboard'))
     
     appointment = Appointment.query.get_or_404(id)
-    doctor = Doctor.query.filter_by(user_id=current_user.id).first()
     
-    if appointment.doctor_id != doctor.id:
+    if appointment.doctor_id != current_user.profile_id:
         flash('Access denied', 'error')
         return redirect(url_for('doctor_dashboard'))
     
@@ -499,6 +2886,7 @@ def doctor_complete_appointment(id):
             notes=notes
         )
         db.session.add(treatment)
+        enqueue_appointment_notification(appointment.id, 'completed')
         db.session.commit()
         
         flash('Appointment completed successfully!', 'success')
@@ -514,18 +2902,35 @@ def doctor_cancel_appointment(id):
         return redirect(url_for('dashboard'))
     
     appointment = Appointment.query.get_or_404(id)
-    doctor = Doctor.query.filter_by(user_id=current_user.id).first()
     
-    if appointment.doctor_id != doctor.id:
+    if appointment.doctor_id != current_user.profile_id:
         flash('Access denied', 'error')
         return redirect(url_for('doctor_dashboard'))
     
     appointment.status = 'Cancelled'
+    enqueue_appointment_notification(appointment.id, 'cancelled')
     db.session.commit()
+    availability.mark_free(appointment.doctor_id, appointment.appointment_date, appointment.appointment_time)
     
     flash('Appointment cancelled', 'success')
     return redirect(url_for('doctor_appointments'))
 
+@app.route('/doctor/appointments/cancel', methods=['POST'])
+@login_required
+def doctor_bulk_cancel():
+    if current_user.role != 'doctor':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    try:
+        values, start, end = bulk_request_values()
+    except (TypeError, ValueError):
+        return bulk_error('start and end must be YYYY-MM-DD, with start on or before end and at most %d days apart'
+                          % app.config['BULK_MAX_DAYS'], 'doctor_appointments')
+    
+    summary = bulk_cancel(current_user.profile_id, start, end)
+    return bulk_response(summary, 'doctor_appointments')
+
 @app.route('/doctor/patient/<int:id>/history')
 @login_required
 def doctor_patient_history(id):
@@ -534,15 +2939,30 @@ def doctor_patient_history(id):
         return redirect(url_for('dashboard'))
     
     patient = Patient.query.get_or_404(id)
-    doctor = Doctor.query.filter_by(user_id=current_user.id).first()
     
-    appointments = Appointment.query.filter_by(
-        patient_id=patient.id,
-        doctor_id=doctor.id,
-        status='Completed'
-    ).order_by(Appointment.appointment_date.desc()).all()
+    entries, next_cursor = treatment_timeline(patient.id, current_user.profile_id, app.config['TIMELINE_PAGE_SIZE'])
+    
+    return render_template('doctor/patient_history.html', patient=patient, entries=entries, next_cursor=next_cursor)
+
+@app.route('/doctor/patient/<int:id>/timeline')
+@login_required
+def doctor_patient_timeline(id):
+    if current_user.role != 'doctor':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    entries, next_cursor = treatment_timeline(id, current_user.profile_id, app.config['TIMELINE_PAGE_SIZE'])
+    return jsonify({'entries': [timeline_entry(entry) for entry in entries], 'next_cursor': next_cursor})
+
+@app.route('/doctor/patient/<int:id>/timeline/<int:appointment_id>')
+@login_required
+def doctor_patient_treatment(id, appointment_id):
+    if current_user.role != 'doctor':
+        return jsonify({'error': 'Access denied'}), 403
     
-    return render_template('doctor/patient_history.html', patient=patient, appointments=appointments)
+    details = treatment_details(appointment_id, id, current_user.profile_id)
+    if details is None:
+        abort(404)
+    return jsonify({'prescription': details.prescription, 'notes': details.notes})
 
 @app.route('/patient/dashboard')
 @login_required
@@ -551,15 +2971,15 @@ def patient_dashboard():
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    patient = Patient.query.filter_by(user_id=current_user.id).first()
-    departments = Department.query.all()
+    patient = current_user.patient
+    departments = cached_departments()
     
     today = date.today()
-    upcoming_appointments = Appointment.query.filter(
+    upcoming_appointments = Appointment.query.options(*appointment_listing_options()).filter(
         Appointment.patient_id == patient.id,
         Appointment.appointment_date >= today,
         Appointment.status == 'Booked'
-    ).order_by(Appointment.appointment_date, Appointment.appointment_time).all()
+    ).order_by(Appointment.appointment_date, Appointment.slot_minute).all()
     
     return render_template('patient/dashboard.html', 
                          patient=patient,
@@ -576,25 +2996,37 @@ def patient_doctors():
     search_query = request.args.get('search', '')
     department_id = request.args.get('department', '')
     
-    query = Doctor.query
+    def render_doctor_cards():
+        if search_query and search_enabled():
+            doctor_ids = search_doctor_ids(search_query, app.config['SEARCH_RESULT_LIMIT'], department_id)
+            doctors = fetch_ranked(Doctor, doctor_ids, joinedload(Doctor.department))
+        else:
+            query = Doctor.query.options(joinedload(Doctor.department))
+            
+            if search_query:
+                query = query.filter(
+                    (Doctor.full_name.contains(search_query)) |
+                    (Department.name.contains(search_query))
+                ).join(Department)
+            
+            if department_id:
+                query = query.filter_by(department_id=department_id)
+            
+            doctors = query.all()
+        return render_template('patient/_doctor_cards.html', doctors=doctors)
     
     if search_query:
-        query = query.filter(
-            (Doctor.full_name.contains(search_query)) |
-            (Department.name.contains(search_query))
-        ).join(Department)
-    
-    if department_id:
-        query = query.filter_by(department_id=department_id)
-    
-    doctors = query.all()
-    departments = Department.query.all()
-    
-    return render_template('patient/doctors.html', 
-                         doctors=doctors, 
-                         departments=departments,
-                         search_query=search_query,
-                         selected_department=department_id)
+        doctor_cards = render_doctor_cards()
+    else:
+        doctor_cards = page_cache.fetch('doctor_cards:%s' % department_id, ('doctors', 'departments'),
+                                        render_doctor_cards)
+    
+    return conditional_response(render_template('patient/doctors.html', 
+                                                doctor_cards=doctor_cards, 
+                                                departments=cached_departments(),
+                                                search_query=search_query,
+                                                selected_department=department_id),
+                                page_cache.last_modified())
 
 @app.route('/patient/book/<int:doctor_id>', methods=['GET', 'POST'])
 @login_required
@@ -604,45 +3036,58 @@ def patient_book_appointment(doctor_id):
         return redirect(url_for('dashboard'))
     
     doctor = Doctor.query.get_or_404(doctor_id)
-    patient = Patient.query.filter_by(user_id=current_user.id).first()
     
     if request.method == 'POST':
         appointment_date = request.form.get('appointment_date')
         appointment_time = request.form.get('appointment_time')
         symptoms = request.form.get('symptoms')
         
-        appt_date = datetime.strptime(appointment_date, '%Y-%m-%d').date()
+        try:
+            appt_date = datetime.strptime(appointment_date or '', '%Y-%m-%d').date()
+        except ValueError:
+            appt_date = None
+        window = availability.window()
+        if appt_date is None or not window[0] <= appt_date <= window[-1]:
+            flash('Please choose a date between %s and %s.' % (window[0].strftime('%b %d'), window[-1].strftime('%b %d')),
+                  'error')
+            return redirect(url_for('patient_book_appointment', doctor_id=doctor_id))
+        
+        if appointment_time not in SLOT_BITS:
+            flash('Please choose one of the listed time slots.', 'error')
+            return redirect(url_for('patient_book_appointment', doctor_id=doctor_id))
         
-        existing = Appointment.query.filter_by(
-            doctor_id=doctor.id,
-            appointment_date=appt_date,
-            appointment_time=appointment_time
-        ).filter(Appointment.status != 'Cancelled').first()
+        appointment = book_slot(current_user.profile_id, doctor.id, appt_date, appointment_time, symptoms)
         
-        if existing:
+        if appointment is None:
             flash('This time slot is already booked. Please choose another time.', 'error')
             return redirect(url_for('patient_book_appointment', doctor_id=doctor_id))
         
-        appointment = Appointment(
-            patient_id=patient.id,
-            doctor_id=doctor.id,
-            appointment_date=appt_date,
-            appointment_time=appointment_time,
-            symptoms=symptoms,
-            status='Booked'
-        )
-        db.session.add(appointment)
-        db.session.commit()
-        
         flash('Appointment booked successfully!', 'success')
         return redirect(url_for('patient_appointments'))
     
-    today = date.today()
-    available_dates = [today + timedelta(days=i) for i in range(1, 8)]
-    
     return render_template('patient/book_appointment.html', 
                          doctor=doctor, 
-                         available_dates=available_dates)
+                         available_dates=availability.available_dates(doctor.id),
+                         time_slots=SLOT_TIMES)
+
+@app.route('/patient/book/<int:doctor_id>/availability')
+@login_required
+def patient_doctor_availability(doctor_id):
+    if current_user.role != 'patient':
+        return jsonify(error='Access denied'), 403
+    
+    Doctor.query.get_or_404(doctor_id)
+    
+    appointment_date = request.args.get('date')
+    appointment_time = request.args.get('time')
+    if appointment_date and appointment_time:
+        try:
+            appt_date = datetime.strptime(appointment_date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify(error='Invalid date'), 400
+        return jsonify(available=availability.is_free(doctor_id, appt_date, appointment_time))
+    
+    return jsonify(doctor_id=doctor_id, slots=availability.free_slots(doctor_id))
 
 @app.route('/patient/appointments')
 @login_required
@@ -651,17 +3096,14 @@ def patient_appointments():
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    patient = Patient.query.filter_by(user_id=current_user.id).first()
+    patient_id = current_user.profile_id
     
-    upcoming = Appointment.query.filter(
-        Appointment.patient_id == patient.id,
+    upcoming = Appointment.query.options(*appointment_listing_options()).filter(
+        Appointment.patient_id == patient_id,
         Appointment.appointment_date >= date.today()
-    ).order_by(Appointment.appointment_date, Appointment.appointment_time).all()
+    ).order_by(Appointment.appointment_date, Appointment.slot_minute).all()
     
-    past = Appointment.query.filter(
-        Appointment.patient_id == patient.id,
-        Appointment.appointment_date < date.today()
-    ).order_by(Appointment.appointment_date.desc()).all()
+    past = appointment_history(patient_id, before=date.today())
     
     return render_template('patient/appointments.html', 
                          upcoming_appointments=upcoming,
@@ -675,14 +3117,15 @@ def patient_cancel_appointment(id):
         return redirect(url_for('dashboard'))
     
     appointment = Appointment.query.get_or_404(id)
-    patient = Patient.query.filter_by(user_id=current_user.id).first()
     
-    if appointment.patient_id != patient.id:
+    if appointment.patient_id != current_user.profile_id:
         flash('Access denied', 'error')
         return redirect(url_for('patient_dashboard'))
     
     appointment.status = 'Cancelled'
+    enqueue_appointment_notification(appointment.id, 'cancelled')
     db.session.commit()
+    availability.mark_free(appointment.doctor_id, appointment.appointment_date, appointment.appointment_time)
     
     flash('Appointment cancelled successfully', 'success')
     return redirect(url_for('patient_appointments'))
@@ -694,7 +3137,7 @@ def patient_profile():
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    patient = Patient.query.filter_by(user_id=current_user.id).first()
+    patient = current_user.load(fresh=True).patient
     
     if request.method == 'POST':
         patient.full_name = request.form.get('full_name')
@@ -710,11 +3153,11 @@ def patient_profile():
             patient.date_of_birth = datetime.strptime(dob, '%Y-%m-%d').date()
         
         email = request.form.get('email')
-        if email != current_user.email:
+        if email != patient.user.email:
             if User.query.filter_by(email=email).first():
                 flash('Email already in use', 'error')
                 return redirect(url_for('patient_profile'))
-            current_user.email = email
+            patient.user.email = email
         
         db.session.commit()
         flash('Profile updated successfully!', 'success')
@@ -722,6 +3165,527 @@ def patient_profile():
     
     return render_template('patient/profile.html', patient=patient)
 
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+def api_login_required(*roles):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return api_error('Authentication required', 401)
+            if roles and current_user.role not in roles:
+                return api_error('Access denied', 403)
+            try:
+                return view(*args, **kwargs)
+            except ValueError as exc:
+                return api_error(str(exc), 400)
+        return wrapper
+    return decorator
+
+def api_fields(available):
+    requested = request.args.get('fields')
+    if not requested:
+        return list(available)
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError('Unknown fields: %s. Available: %s' % (', '.join(unknown), ', '.join(available)))
+    return fields
+
+def api_page_size():
+    limit = request.args.get('limit', app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, app.config['API_MAX_PAGE_SIZE']))
+
+def api_encoding():
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def api_response(payload):
+    body = json.dumps(payload, separators=(',', ':'), default=export_value).encode('utf-8')
+    encoding = api_encoding() if len(body) >= app.config['API_COMPRESS_MIN_SIZE'] else None
+    etag = hashlib.sha1(body).hexdigest() + ('-' + encoding if encoding else '')
+    
+    response = Response(mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        return response
+    if encoding == 'br':
+        body = brotli.compress(body)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.set_data(body)
+    return response
+
+def api_rows(fields, rows, next_cursor=None):
+    return {'fields': fields, 'rows': [list(row[:len(fields)]) for row in rows], 'next_cursor': next_cursor}
+
+APPOINTMENT_FIELDS = ('id', 'appointment_date', 'appointment_time', 'slot_minute', 'status', 'symptoms',
+                      'doctor_id', 'doctor_name', 'department', 'patient_id', 'patient_name')
+DOCTOR_FIELDS = ('id', 'full_name', 'department_id', 'department', 'phone', 'qualifications',
+                 'experience_years', 'available_days', 'consultation_fee')
+
+def appointment_select(appointments, fields):
+    doctors, departments, patients = Doctor.__table__, Department.__table__, Patient.__table__
+    columns = {
+        'doctor_name': doctors.c.full_name,
+        'department': departments.c.name,
+        'patient_name': patients.c.full_name,
+    }
+    query = select(
+        *[columns.get(field, appointments.c.get(field)).label(field) for field in fields],
+        appointments.c.appointment_date.label('_date'),
+        appointments.c.id.label('_id')
+    ).select_from(appointments)
+    if 'doctor_name' in fields or 'department' in fields:
+        query = query.join(doctors, doctors.c.id == appointments.c.doctor_id)
+    if 'department' in fields:
+        query = query.join(departments, departments.c.id == doctors.c.department_id)
+    if 'patient_name' in fields:
+        query = query.join(patients, patients.c.id == appointments.c.patient_id)
+    return query
+
+def appointment_history_page(sources, fields, per_page, criteria):
+    rows = []
+    for appointments, treatments in sources:
+        query = appointment_select(appointments, fields).where(*criteria(appointments))
+        after = date_cursor_filter(appointments.c.appointment_date, appointments.c.id)
+        if after is not None:
+            query = query.where(after)
+        query = query.order_by(appointments.c.appointment_date.desc(), appointments.c.id.desc()).limit(per_page + 1)
+        rows.extend(db.session.execute(query).all())
+    rows.sort(key=lambda row: (row._date, row._id), reverse=True)
+    next_cursor = '%s_%d' % (rows[per_page - 1]._date.isoformat(), rows[per_page - 1]._id) if len(rows) > per_page else None
+    return api_rows(fields, rows[:per_page], next_cursor)
+
+@api.route('/patient/appointments')
+@api_login_required('patient')
+def api_patient_appointments():
+    fields = api_fields(APPOINTMENT_FIELDS)
+    patient_id = current_user.profile_id
+    today = date.today()
+    
+    if request.args.get('when', 'upcoming') == 'upcoming':
+        appointments = Appointment.__table__
+        rows = db.session.execute(appointment_select(appointments, fields).where(
+            appointments.c.patient_id == patient_id,
+            appointments.c.appointment_date >= today
+        ).order_by(appointments.c.appointment_date, appointments.c.slot_minute)).all()
+        return api_response(api_rows(fields, rows))
+    
+    return api_response(appointment_history_page(
+        history_sources(db.session), fields, api_page_size(),
+        lambda appointments: [appointments.c.patient_id == patient_id, appointments.c.appointment_date < today]
+    ))
+
+@api.route('/doctor/appointments')
+@api_login_required('doctor')
+def api_doctor_appointments():
+    fields = api_fields(APPOINTMENT_FIELDS)
+    doctor_id = current_user.profile_id
+    status = request.args.get('status')
+    
+    def criteria(appointments):
+        conditions = [appointments.c.doctor_id == doctor_id]
+        if status:
+            conditions.append(appointments.c.status == status)
+        return conditions
+    
+    return api_response(appointment_history_page(
+        [(Appointment.__table__, Treatment.__table__)], fields, api_page_size(), criteria
+    ))
+
+@api.route('/doctors')
+@api_login_required()
+def api_doctors():
+    fields = api_fields(DOCTOR_FIELDS)
+    search_query = request.args.get('search', '')
+    department_id = request.args.get('department', '')
+    doctors, departments = Doctor.__table__, Department.__table__
+    
+    query = select(
+        *[(departments.c.name if field == 'department' else doctors.c[field]).label(field) for field in fields],
+        doctors.c.id.label('_id')
+    ).select_from(doctors.join(departments, departments.c.id == doctors.c.department_id))
+    if department_id:
+        query = query.where(doctors.c.department_id == department_id)
+    
+    if search_query and search_enabled():
+        doctor_ids = search_doctor_ids(search_query, app.config['SEARCH_RESULT_LIMIT'], department_id)
+        rank = {doctor_id: position for position, doctor_id in enumerate(doctor_ids)}
+        rows = sorted(db.session.execute(query.where(doctors.c.id.in_(doctor_ids))).all(),
+                      key=lambda row: rank[row._id])
+    else:
+        if search_query:
+            query = query.where(or_(doctors.c.full_name.contains(search_query),
+                                    departments.c.name.contains(search_query)))
+        rows = db.session.execute(query.order_by(doctors.c.id)).all()
+    return api_response(api_rows(fields, rows))
+
+@api.route('/admin/dashboard')
+@api_login_required('admin')
+def api_admin_dashboard():
+    fields = api_fields(APPOINTMENT_FIELDS)
+    snapshot = stats.snapshot()
+    department_names = {department['id']: department['name'] for department in cached_departments()}
+    
+    recent_ids = snapshot['recent_ids']
+    recent = {row._id: row for row in db.session.execute(
+        appointment_select(Appointment.__table__, fields).where(Appointment.__table__.c.id.in_(recent_ids))
+    )}
+    
+    return api_response({
+        'totals': snapshot['totals'],
+        'by_status': snapshot['by_status'],
+        'by_department': {department_names.get(department_id, department_id): count
+                          for department_id, count in snapshot['by_department'].items()},
+        'recent_appointments': api_rows(fields, [recent[i] for i in recent_ids if i in recent]),
+    })
+
+app.register_blueprint(api)
+
+IMPORT_REQUIRED_FIELDS = ('username', 'email', 'password', 'full_name')
+
+def read_import_records(path, file_format):
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            for line_no, record in enumerate(csv.DictReader(handle), start=2):
+                yield line_no, record, None
+        else:
+            for line_no, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    yield line_no, None, 'invalid JSON: %s' % exc
+                    continue
+                if isinstance(record, dict):
+                    yield line_no, record, None
+                else:
+                    yield line_no, None, 'expected a JSON object'
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def parse_optional(value, parser):
+    value = (value or '').strip() if isinstance(value, str) else value
+    return parser(value) if value not in (None, '') else None
+
+def build_profile_row(role, record, departments):
+    if role == 'patient':
+        return {
+            'full_name': record['full_name'],
+            'phone': record.get('phone'),
+            'date_of_birth': parse_optional(record.get('date_of_birth'),
+                                            lambda value: datetime.strptime(value, '%Y-%m-%d').date()),
+            'gender': record.get('gender'),
+            'address': record.get('address'),
+            'blood_group': record.get('blood_group'),
+            'emergency_contact': record.get('emergency_contact'),
+            'medical_history': record.get('medical_history'),
+        }
+    
+    department = str(record.get('department') or record.get('department_id') or '').strip()
+    department_id = departments.get(department.lower()) or (int(department) if department.isdigit() else None)
+    if department_id not in departments.values():
+        raise ValueError('unknown department %r' % department)
+    return {
+        'full_name': record['full_name'],
+        'phone': record.get('phone'),
+        'department_id': department_id,
+        'qualifications': record.get('qualifications'),
+        'experience_years': parse_optional(record.get('experience_years'), int),
+        'available_days': record.get('available_days'),
+        'consultation_fee': parse_optional(record.get('consultation_fee'), float) or 0.0,
+    }
+
+def import_batch(role, batch, departments, seen, pool):
+    errors = []
+    candidates = []
+    for line_no, record, error in batch:
+        if error is None:
+            missing = [field for field in IMPORT_REQUIRED_FIELDS if not str(record.get(field) or '').strip()]
+            if missing:
+                error = 'missing %s' % ', '.join(missing)
+        if error is None:
+            try:
+                profile = build_profile_row(role, record, departments)
+            except ValueError as exc:
+                error = str(exc)
+        if error is None:
+            username, email = str(record['username']).strip(), str(record['email']).strip()
+            if username in seen['username']:
+                error = 'duplicate username %s' % username
+            elif email in seen['email']:
+                error = 'duplicate email %s' % email
+        if error is not None:
+            errors.append((line_no, error))
+            continue
+        seen['username'].add(username)
+        seen['email'].add(email)
+        candidates.append((line_no, username, email, str(record['password']), profile))
+    
+    if not candidates:
+        return 0, errors
+    
+    taken_usernames = set(db.session.execute(
+        select(User.username).where(User.username.in_([row[1] for row in candidates]))
+    ).scalars())
+    taken_emails = set(db.session.execute(
+        select(User.email).where(User.email.in_([row[2] for row in candidates]))
+    ).scalars())
+    rows = []
+    for row in candidates:
+        if row[1] in taken_usernames:
+            errors.append((row[0], 'username %s already exists' % row[1]))
+        elif row[2] in taken_emails:
+            errors.append((row[0], 'email %s already registered' % row[2]))
+        else:
+            rows.append(row)
+    if not rows:
+        return 0, errors
+    
+    passwords = [row[3] for row in rows]
+    if pool is not None:
+        hashes = list(pool.map(generate_password_hash, passwords, repeat(app.config['PASSWORD_HASH_METHOD']),
+                               chunksize=max(1, len(passwords) // 32)))
+    else:
+        hashes = [generate_password_hash(password, app.config['PASSWORD_HASH_METHOD']) for password in passwords]
+    
+    profile_model = Patient if role == 'patient' else Doctor
+    try:
+        user_ids = dict(db.session.execute(
+            insert(User).returning(User.username, User.id, sort_by_parameter_order=True),
+            [{'username': row[1], 'email': row[2], 'password_hash': password_hash, 'role': role}
+             for row, password_hash in zip(rows, hashes)]
+        ).all())
+        db.session.execute(insert(profile_model), [dict(row[4], user_id=user_ids[row[1]]) for row in rows])
+        db.session.commit()
+    except IntegrityError as exc:
+        db.session.rollback()
+        errors.extend((row[0], 'batch rejected: %s' % exc.orig) for row in rows)
+        return 0, errors
+    return len(rows), errors
+
+@app.cli.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--role', type=click.Choice(['patient', 'doctor']), default='patient', show_default=True)
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help='Input format; inferred from the file extension by default.')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True,
+              help='Password hashing processes; 0 hashes in this process.')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+              help='Write per-row errors to this file as JSON lines.')
+def import_users_command(path, role, file_format, batch_size, workers, errors_path):
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    departments = {name.lower(): department_id for department_id, name in
+                   db.session.execute(select(Department.id, Department.name))}
+    seen = {'username': set(), 'email': set()}
+    imported = 0
+    all_errors = []
+    started = time.perf_counter()
+    
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    try:
+        for batch in batched(read_import_records(path, file_format), batch_size):
+            count, errors = import_batch(role, batch, departments, seen, pool)
+            imported += count
+            all_errors.extend(errors)
+            elapsed = time.perf_counter() - started
+            click.echo('imported %d rows, %d errors (%.0f rows/s)' % (imported, len(all_errors), imported / elapsed))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if role == 'doctor' and imported:
+        page_cache.bump('doctors')
+    
+    elapsed = time.perf_counter() - started
+    all_errors.sort()
+    for line_no, error in all_errors[:20]:
+        click.echo('line %d: %s' % (line_no, error), err=True)
+    if len(all_errors) > 20:
+        click.echo('... %d more errors' % (len(all_errors) - 20), err=True)
+    if errors_path:
+        with open(errors_path, 'w', encoding='utf-8') as handle:
+            for line_no, error in all_errors:
+                handle.write(json.dumps({'line': line_no, 'error': error}) + '\n')
+    click.echo('Done: %d %ss imported in %.1fs (%.0f rows/s), %d rows rejected' % (
+        imported, role, elapsed, imported / elapsed if elapsed else 0, len(all_errors)))
+
+SEED_FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+                    'Elizabeth', 'Aarav', 'Priya', 'Rahul', 'Ananya', 'Wei', 'Mei', 'Omar', 'Fatima', 'Carlos', 'Sofia']
+SEED_LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Sharma', 'Patel',
+                   'Gupta', 'Chen', 'Wang', 'Khan', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas']
+SEED_SYMPTOMS = ['Fever and headache', 'Chest pain', 'Back pain', 'Skin rash', 'Persistent cough',
+                 'Routine check-up', 'Joint pain', 'Dizziness']
+SEED_DIAGNOSES = ['Viral infection', 'Hypertension', 'Muscle strain', 'Dermatitis', 'Bronchitis',
+                  'Healthy', 'Arthritis', 'Migraine']
+SEED_PASSWORD = 'password'
+
+def seed_users(role, count, batch_size, rng, password_hash, build_profile, progress):
+    profile_model = Patient if role == 'patient' else Doctor
+    for start in range(0, count, batch_size):
+        numbers = range(start, min(start + batch_size, count))
+        user_ids = db.session.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{'username': 'seed_%s_%d' % (role, n), 'email': 'seed_%s_%d@example.com' % (role, n),
+              'password_hash': password_hash, 'role': role} for n in numbers]
+        ).scalars().all()
+        db.session.execute(insert(profile_model), [
+            dict(build_profile(n, rng), user_id=user_id) for n, user_id in zip(numbers, user_ids)
+        ])
+        db.session.commit()
+        progress('%ss' % role, numbers[-1] + 1)
+
+def seed_appointments(count, batch_size, rng, doctor_ids, patient_ids, fill, progress):
+    per_day = len(doctor_ids) * len(SLOT_TIMES)
+    today = date.today()
+    day = today + timedelta(days=app.config['BOOKING_WINDOW_DAYS']) - timedelta(days=int(count / (per_day * fill)) + 1)
+    treatment_sql = text(
+        'INSERT INTO treatments (appointment_id, diagnosis, prescription, notes, created_at) '
+        'SELECT id, CASE id %% %(n)d %(cases)s END, \'Rest and fluids\', NULL, created_at '
+        'FROM appointments WHERE id > :last_id AND status = \'Completed\'' % {
+            'n': len(SEED_DIAGNOSES),
+            'cases': ' '.join("WHEN %d THEN '%s'" % (i, diagnosis) for i, diagnosis in enumerate(SEED_DIAGNOSES)),
+        }
+    )
+    
+    created = 0
+    rows = []
+    while created < count:
+        for doctor_id in doctor_ids:
+            for slot_time in SLOT_TIMES:
+                if created >= count or rng.random() >= fill:
+                    continue
+                if day > today:
+                    status = 'Cancelled' if rng.random() < 0.05 else 'Booked'
+                else:
+                    status = 'Cancelled' if rng.random() < 0.15 else 'Completed'
+                rows.append({
+                    'patient_id': rng.choice(patient_ids),
+                    'doctor_id': doctor_id,
+                    'appointment_date': day,
+                    'appointment_time': slot_time,
+                    'slot_minute': parse_slot_minute(slot_time),
+                    'status': status,
+                    'symptoms': rng.choice(SEED_SYMPTOMS),
+                    'created_at': datetime.combine(day, datetime.min.time()) - timedelta(days=rng.randint(1, 14)),
+                })
+                created += 1
+        day += timedelta(days=1)
+        if len(rows) >= batch_size or created >= count:
+            last_id = db.session.execute(select(func.coalesce(func.max(Appointment.id), 0))).scalar()
+            db.session.execute(insert(Appointment), rows)
+            db.session.execute(treatment_sql, {'last_id': last_id})
+            db.session.commit()
+            rows = []
+            progress('appointments', created)
+
+def seed_database(doctors, patients, appointments, batch_size=50000, seed=42, fill=0.6, progress=None):
+    progress = progress or (lambda label, count: None)
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(SEED_PASSWORD, app.config['PASSWORD_HASH_METHOD'])
+    department_ids = db.session.execute(select(Department.id)).scalars().all()
+    
+    seed_users('doctor', doctors, batch_size, rng, password_hash, lambda n, rng: {
+        'department_id': department_ids[n % len(department_ids)],
+        'full_name': 'Dr. %s %s' % (rng.choice(SEED_FIRST_NAMES), rng.choice(SEED_LAST_NAMES)),
+        'phone': '555%07d' % n,
+        'qualifications': 'MBBS, MD',
+        'experience_years': rng.randint(1, 35),
+        'available_days': 'Mon-Sun',
+        'consultation_fee': rng.choice([30.0, 50.0, 75.0, 100.0]),
+    }, progress)
+    seed_users('patient', patients, batch_size, rng, password_hash, lambda n, rng: {
+        'full_name': '%s %s' % (rng.choice(SEED_FIRST_NAMES), rng.choice(SEED_LAST_NAMES)),
+        'phone': '9%09d' % n,
+        'date_of_birth': date(1940, 1, 1) + timedelta(days=rng.randrange(30000)),
+        'gender': rng.choice(['Male', 'Female', 'Other']),
+        'blood_group': rng.choice(['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']),
+    }, progress)
+    
+    doctor_ids = db.session.execute(
+        select(Doctor.id).join(User).where(User.username.like('seed_doctor_%'))
+    ).scalars().all()
+    patient_ids = db.session.execute(
+        select(Patient.id).join(User).where(User.username.like('seed_patient_%'))
+    ).scalars().all()
+    if appointments and doctor_ids and patient_ids:
+        seed_appointments(appointments, batch_size, rng, doctor_ids, patient_ids, fill, progress)
+        rebuild_roster(db.session.connection())
+        db.session.commit()
+    stats.invalidate()
+    page_cache.bump('doctors')
+
+@app.cli.command('seed')
+@click.option('--doctors', default=1000, show_default=True)
+@click.option('--patients', default=1000000, show_default=True)
+@click.option('--appointments', default=10000000, show_default=True)
+@click.option('--batch-size', default=50000, show_default=True)
+@click.option('--seed', 'rng_seed', default=42, show_default=True, help='Random seed for reproducible data.')
+def seed_command(doctors, patients, appointments, batch_size, rng_seed):
+    if db.session.execute(select(User.id).where(User.username.like('seed_%')).limit(1)).first():
+        raise click.ClickException('Database already contains seeded data.')
+    
+    started = time.perf_counter()
+    
+    def progress(label, count):
+        click.echo('%s: %d (%.0fs)' % (label, count, time.perf_counter() - started))
+    
+    seed_database(doctors, patients, appointments, batch_size=batch_size, seed=rng_seed, progress=progress)
+    click.echo('Seeded in %.1fs. All seeded accounts use the password %r.' % (
+        time.perf_counter() - started, SEED_PASSWORD))
+
+@app.cli.command('archive')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Archive appointments dated before this day (default: ARCHIVE_AFTER_DAYS ago).')
+@click.option('--batch-size', default=app.config['ARCHIVE_BATCH_SIZE'], show_default=True)
+def archive_command(before, batch_size):
+    cutoff = before.date() if before else date.today() - timedelta(days=app.config['ARCHIVE_AFTER_DAYS'])
+    started = time.perf_counter()
+    
+    def progress(count):
+        click.echo('archived %d appointments (%.0fs)' % (count, time.perf_counter() - started))
+    
+    archived = archive_appointments(cutoff, batch_size, progress)
+    click.echo('Done: %d completed or cancelled appointments before %s moved to the archive.' % (
+        archived, cutoff.isoformat()))
+
+@app.cli.command('run-jobs')
+@click.option('--workers', default=1, show_default=True, help='Worker threads.')
+@click.option('--once', is_flag=True, help='Run the jobs that are due now, then exit.')
+def run_jobs_command(workers, once):
+    job_queue.stop()
+    if once:
+        job_queue.recover()
+        click.echo('Ran %d jobs.' % job_queue.run_pending())
+        return
+    job_queue.start(workers)
+    click.echo('Running background jobs with %d workers; press Ctrl+C to stop.' % workers)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        job_queue.stop()
+
 if __name__ == '__main__':
-    init_database()
+    create_app()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def seed(db, models, appointments, doctors=100, patients=10000, batch_size=50000):
+    from sqlalchemy import insert
+    
+    User, Doctor, Patient, Appointment = models
+    rng = random.Random(42)
+    with db.engine.begin() as connection:
+        connection.execute(insert(User), [
+            {'username': 'export%d' % i, 'email': 'export%d@example.com' % i, 'password_hash': 'x',
+             'role': 'doctor' if i < doctors else 'patient'}
+            for i in range(doctors + patients)
+        ])
+        first_user = connection.execute(db.text("SELECT min(id) FROM users WHERE username LIKE 'export%'")).scalar()
+        connection.execute(insert(Doctor), [
+            {'user_id': first_user + i, 'department_id': 1 + i % 6, 'full_name': 'Doctor %d' % i}
+            for i in range(doctors)
+        ])
+        connection.execute(insert(Patient), [
+            {'user_id': first_user + doctors + i, 'full_name': 'Patient %d' % i, 'phone': '555%05d' % i}
+            for i in range(patients)
+        ])
+    
+    from app import SLOT_TIMES
+    start = date.today() - timedelta(days=appointments // (doctors * len(SLOT_TIMES)) + 1)
+    for offset in range(0, appointments, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, appointments)):
+            slot = i // doctors
+            rows.append({
+                'patient_id': 1 + rng.randrange(patients),
+                'doctor_id': 1 + i % doctors,
+                'appointment_date': start + timedelta(days=slot // len(SLOT_TIMES)),
+                'appointment_time': SLOT_TIMES[slot % len(SLOT_TIMES)],
+                'status': rng.choice(['Completed', 'Completed', 'Cancelled', 'Booked']),
+                'symptoms': 'routine check-up',
+            })
+        with db.engine.begin() as connection:
+            connection.execute(insert(Appointment), rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure peak RSS and throughput of the streaming export.')
+    parser.add_argument('--appointments', type=int, default=5000000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'export.db')
+        os.environ['JOB_WORKERS'] = '0'
+        from app import create_app, db, User, Doctor, Patient, Appointment
+        
+        app = create_app()
+        with app.app_context():
+            started = time.perf_counter()
+            seed(db, (User, Doctor, Patient, Appointment), args.appointments)
+            seed_seconds = time.perf_counter() - started
+        
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        rss_before = peak_rss_mb()
+        
+        started = time.perf_counter()
+        response = client.get('/admin/export/appointments?format=%s' % args.format, buffered=False)
+        lines = 0
+        size = 0
+        for chunk in response.iter_encoded():
+            lines += chunk.count(b'\n')
+            size += len(chunk)
+        response.close()
+        elapsed = time.perf_counter() - started
+        
+        rows = lines - 1 if args.format == 'csv' else lines
+        print(json.dumps({
+            'appointments': args.appointments,
+            'format': args.format,
+            'seed_seconds': round(seed_seconds, 1),
+            'export_seconds': round(elapsed, 1),
+            'rows_per_second': round(rows / elapsed),
+            'exported_mb': round(size / 1024 / 1024, 1),
+            'peak_rss_before_export_mb': round(rss_before, 1),
+            'peak_rss_after_export_mb': round(peak_rss_mb(), 1),
+        }, indent=2))
+        
+        with app.app_context():
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEARCH_TERMS = ['smi', 'pat', 'car', 'neuro', 'chen', 'dr', 'gar', 'der']
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+    
+    def call(self, client, label, method, path, **kwargs):
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.timings[label].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[label] += 1
+        return response
+    
+    def report(self, elapsed):
+        routes = {}
+        for label, values in sorted(self.timings.items()):
+            values.sort()
+            routes[label] = {
+                'count': len(values),
+                'errors': self.errors[label],
+                'mean_ms': round(sum(values) / len(values), 2),
+                'p50_ms': round(percentile(values, 0.50), 2),
+                'p95_ms': round(percentile(values, 0.95), 2),
+                'p99_ms': round(percentile(values, 0.99), 2),
+                'requests_per_s': round(len(values) / elapsed, 1),
+            }
+        total = sum(route['count'] for route in routes.values())
+        return {'elapsed_s': round(elapsed, 2), 'requests_per_s': round(total / elapsed, 1), 'routes': routes}
+
+def run_flows(app, recorder, iterations, patients, seed):
+    from app import db, Appointment, Doctor, Patient, User, SEED_PASSWORD
+    
+    rng = random.Random(seed)
+    doctor_clients = {}
+    
+    for _ in range(iterations):
+        patient_number = rng.randrange(patients)
+        client = app.test_client()
+        recorder.call(client, 'POST /login (patient)', 'post', '/login',
+                      data={'username': 'seed_patient_%d' % patient_number, 'password': SEED_PASSWORD})
+        
+        response = recorder.call(client, 'GET /patient/doctors', 'get',
+                                 '/patient/doctors?search=%s' % rng.choice(SEARCH_TERMS))
+        doctor_ids = [int(i) for i in re.findall(rb'/patient/book/(\d+)', response.data)]
+        if not doctor_ids:
+            continue
+        doctor_id = rng.choice(doctor_ids)
+        
+        recorder.call(client, 'GET /patient/book/<doctor_id>', 'get', '/patient/book/%d' % doctor_id)
+        slots = recorder.call(client, 'GET /patient/book/<doctor_id>/availability', 'get',
+                              '/patient/book/%d/availability' % doctor_id).get_json()['slots']
+        if not slots:
+            continue
+        appointment_date = rng.choice(sorted(slots))
+        appointment_time = rng.choice(slots[appointment_date])
+        recorder.call(client, 'POST /patient/book/<doctor_id>', 'post', '/patient/book/%d' % doctor_id, data={
+            'appointment_date': appointment_date,
+            'appointment_time': appointment_time,
+            'symptoms': 'benchmark',
+        })
+        
+        with app.app_context():
+            row = db.session.query(Appointment.id, User.username).join(
+                Doctor, Doctor.id == Appointment.doctor_id
+            ).join(User, User.id == Doctor.user_id).join(
+                Patient, Patient.id == Appointment.patient_id
+            ).filter(
+                Appointment.doctor_id == doctor_id,
+                Appointment.appointment_time == appointment_time,
+                Appointment.status == 'Booked',
+                Patient.user_id == db.session.query(User.id).filter_by(
+                    username='seed_patient_%d' % patient_number).scalar_subquery()
+            ).order_by(Appointment.id.desc()).first()
+        if row is None:
+            continue
+        
+        doctor_client = doctor_clients.get(row.username)
+        if doctor_client is None:
+            doctor_client = doctor_clients[row.username] = app.test_client()
+            recorder.call(doctor_client, 'POST /login (doctor)', 'post', '/login',
+                          data={'username': row.username, 'password': SEED_PASSWORD})
+        recorder.call(doctor_client, 'GET /doctor/dashboard', 'get', '/doctor/dashboard')
+        recorder.call(doctor_client, 'GET /doctor/appointment/<id>/complete', 'get',
+                      '/doctor/appointment/%d/complete' % row.id)
+        recorder.call(doctor_client, 'POST /doctor/appointment/<id>/complete', 'post',
+                      '/doctor/appointment/%d/complete' % row.id,
+                      data={'diagnosis': 'Benchmark', 'prescription': 'None', 'notes': ''})
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(result, baseline_path):
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = json.load(handle)
+    print('%-45s %10s %10s %8s' % ('route', 'base p95', 'p95', 'change'))
+    for label, route in result['routes'].items():
+        before = baseline['routes'].get(label)
+        if before:
+            change = (route['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            print('%-45s %10.2f %10.2f %+7.1f%%' % (label, before['p95_ms'], route['p95_ms'], change))
+    print('%-45s %10.1f %10.1f' % ('requests/s', baseline['requests_per_s'], result['requests_per_s']))
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the login -> search -> book -> complete flow and report '
+                                                 'per-route latency percentiles.')
+    parser.add_argument('--database-url', help='Use an existing database seeded with "flask seed".')
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--appointments', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=100, help='Flows per thread.')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--output', help='Write the JSON result to this file.')
+    parser.add_argument('--compare', help='Print p95 changes against an earlier JSON result.')
+    args = parser.parse_args()
+    
+    directory = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(directory.name, 'flow.db')
+    os.environ['JOB_WORKERS'] = '0'
+    from app import create_app, db, seed_database
+    
+    app = create_app()
+    with app.app_context():
+        if not args.database_url:
+            seed_database(args.doctors, args.patients, args.appointments)
+        patients = db.session.execute(db.text(
+            "SELECT count(*) FROM users WHERE username LIKE 'seed_patient_%'")).scalar()
+    if not patients:
+        parser.error('the database has no seeded patients; run "flask seed" first')
+    
+    recorder = Recorder()
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_flows, args=(app, recorder, args.iterations, patients, seed))
+        for seed in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = recorder.report(time.perf_counter() - started)
+    result.update({
+        'revision': git_revision(),
+        'threads': args.threads,
+        'iterations': args.iterations,
+    })
+    
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(result, handle, indent=2)
+    if args.compare:
+        print_comparison(result, args.compare)
+    
+    with app.app_context():
+        db.engine.dispose()
+    directory.cleanup()
+
+if __name__ == '__main__':
+    main()
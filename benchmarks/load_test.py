@@ -0,0 +1,165 @@
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = {
+    'baseline': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'},
+    'tuned': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL'},
+}
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+def seed(doctors, patients):
+    from werkzeug.security import generate_password_hash
+    from app import db, User, Doctor, Patient
+    
+    password_hash = generate_password_hash('password')
+    for i in range(doctors):
+        user = User(username='loaddoc%d' % i, email='loaddoc%d@example.com' % i,
+                    password_hash=password_hash, role='doctor')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Doctor(user_id=user.id, department_id=1 + i % 6, full_name='Doctor %d' % i,
+                              available_days='Mon-Sun', consultation_fee=50))
+    for i in range(patients):
+        user = User(username='loadpat%d' % i, email='loadpat%d@example.com' % i,
+                    password_hash=password_hash, role='patient')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Patient(user_id=user.id, full_name='Patient %d' % i, phone='555%04d' % i))
+    db.session.commit()
+    return [doctor.id for doctor in Doctor.query.all()]
+
+def client_loop(base_url, username, doctor_ids, deadline, write_ratio, results, lock):
+    from app import SLOT_TIMES
+    
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect()
+    )
+    
+    def call(method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        try:
+            response = opener.open(urllib.request.Request(base_url + path, data=body, method=method))
+            response.read()
+            return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+    
+    call('POST', '/login', {'username': username, 'password': 'password'})
+    rng = random.Random(username)
+    counts = {'reads': 0, 'bookings': 0, 'errors': 0}
+    
+    while time.monotonic() < deadline:
+        if rng.random() < write_ratio:
+            status = call('POST', '/patient/book/%d' % rng.choice(doctor_ids), {
+                'appointment_date': (date.today() + timedelta(days=rng.randint(1, 7))).isoformat(),
+                'appointment_time': rng.choice(SLOT_TIMES),
+                'symptoms': 'load test',
+            })
+            counts['bookings'] += 1
+        else:
+            path = rng.choice([
+                '/patient/dashboard',
+                '/patient/appointments',
+                '/patient/doctors',
+                '/patient/book/%d/availability' % rng.choice(doctor_ids),
+            ])
+            status = call('GET', path)
+            counts['reads'] += 1
+        if status >= 500:
+            counts['errors'] += 1
+    
+    with lock:
+        for key, value in counts.items():
+            results[key] += value
+
+def run_worker(args):
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    
+    app = create_app()
+    with app.app_context():
+        doctor_ids = seed(args.doctors, args.clients)
+        bookings_before = db.session.execute(db.text('SELECT count(*) FROM appointments')).scalar()
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:%d' % server.server_port
+    
+    results = {'reads': 0, 'bookings': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    started = time.monotonic()
+    clients = [
+        threading.Thread(target=client_loop, args=(
+            base_url, 'loadpat%d' % i, doctor_ids, deadline, args.write_ratio, results, lock
+        ))
+        for i in range(args.clients)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.monotonic() - started
+    server.shutdown()
+    
+    with app.app_context():
+        booked = db.session.execute(db.text('SELECT count(*) FROM appointments')).scalar() - bookings_before
+    
+    results.update({
+        'elapsed_s': round(elapsed, 2),
+        'requests_per_s': round((results['reads'] + results['bookings']) / elapsed, 1),
+        'appointments_created': booked,
+    })
+    print(json.dumps(results))
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed read/booking load test against a threaded server.')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--doctors', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        run_worker(args)
+        return
+    
+    summary = {}
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(directory, 'load.db'), JOB_WORKERS='0',
+                       **PROFILES[profile])
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker',
+                 '--clients', str(args.clients), '--doctors', str(args.doctors),
+                 '--duration', str(args.duration), '--write-ratio', str(args.write_ratio)],
+                env=env, cwd=directory, capture_output=True, text=True, check=True
+            ).stdout
+        summary[profile] = json.loads(output.strip().splitlines()[-1])
+        print('%-9s %s' % (profile, json.dumps(summary[profile])))
+    
+    if 'baseline' in summary and 'tuned' in summary:
+        print('throughput gain: %.2fx' % (summary['tuned']['requests_per_s'] / summary['baseline']['requests_per_s']))
+
+if __name__ == '__main__':
+    main()
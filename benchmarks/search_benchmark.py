@@ -0,0 +1,89 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select, text
+
+from app import db, Patient, ensure_search_index
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'Aarav', 'Priya', 'Rahul', 'Ananya', 'Wei', 'Mei', 'Omar', 'Fatima', 'Carlos', 'Sofia']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Sharma', 'Patel',
+              'Gupta', 'Chen', 'Wang', 'Khan', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas']
+
+def seed(engine, count, batch_size=50000):
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        for start in range(0, count, batch_size):
+            rows = [
+                {
+                    'user_id': i + 1,
+                    'full_name': '%s %s' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)),
+                    'phone': '%010d' % rng.randrange(10 ** 10),
+                }
+                for i in range(start, min(start + batch_size, count))
+            ]
+            connection.execute(insert(Patient.__table__), rows)
+
+def like_search(connection, term):
+    return connection.execute(select(Patient.id).where(
+        Patient.full_name.contains(term) | Patient.phone.contains(term)
+    )).all()
+
+def fts_search(connection, term, limit):
+    return connection.execute(text(
+        'SELECT rowid FROM patients_fts WHERE patients_fts MATCH :match ORDER BY rank LIMIT :limit'
+    ), {'match': '"%s"*' % term, 'limit': limit}).all()
+
+def measure(search, terms):
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        search(term)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare LIKE and FTS5 patient search.')
+    parser.add_argument('--patients', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'search.db'))
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            ensure_search_index(connection)
+        
+        started = time.perf_counter()
+        seed(engine, args.patients)
+        print('seeded %d patients in %.1fs' % (args.patients, time.perf_counter() - started))
+        
+        rng = random.Random(7)
+        terms = [rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randint(3, 6)] for _ in range(args.queries)]
+        with engine.connect() as connection:
+            results = {
+                'like': measure(lambda term: like_search(connection, term), terms),
+                'fts': measure(lambda term: fts_search(connection, term, args.limit), terms),
+            }
+        engine.dispose()
+    
+    for name, result in results.items():
+        print('%-5s mean %8.2f ms  p50 %8.2f ms  p95 %8.2f ms' % (
+            name, result['mean_ms'], result['p50_ms'], result['p95_ms']))
+    print('speedup (mean): %.1fx' % (results['like']['mean_ms'] / results['fts']['mean_ms']))
+
+if __name__ == '__main__':
+    main()
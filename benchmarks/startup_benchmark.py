@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, %r)
+import app
+imported = time.perf_counter()
+app.create_app()
+initialized = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'init_ms': (initialized - imported) * 1000}))
+""" % ROOT
+
+def run_probe(database_path):
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + database_path, JOB_WORKERS='0')
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, cwd=ROOT, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def forget_schema_version(database_path):
+    connection = sqlite3.connect(database_path)
+    connection.execute('DROP TABLE IF EXISTS schema_version')
+    connection.commit()
+    connection.close()
+
+def summarize(samples):
+    summary = {}
+    for key in ('import_ms', 'init_ms'):
+        values = sorted(sample[key] for sample in samples)
+        summary[key] = {
+            'median': round(statistics.median(values), 1),
+            'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure process start-up time: importing app.py and running '
+                                                 'create_app() against a new and an existing database.')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', help='Write the JSON result to this file.')
+    args = parser.parse_args()
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        samples = []
+        for n in range(args.runs):
+            samples.append(run_probe(os.path.join(directory, 'fresh-%d.db' % n)))
+        results['new database'] = summarize(samples)
+        
+        database_path = os.path.join(directory, 'existing.db')
+        run_probe(database_path)
+        
+        samples = []
+        for _ in range(args.runs):
+            forget_schema_version(database_path)
+            samples.append(run_probe(database_path))
+        results['existing database, full initialization'] = summarize(samples)
+        
+        samples = [run_probe(database_path) for _ in range(args.runs)]
+        results['existing database, restart'] = summarize(samples)
+    
+    for scenario, summary in results.items():
+        print('%-42s import %7.1f ms (p95 %7.1f)   init %7.1f ms (p95 %7.1f)' % (
+            scenario, summary['import_ms']['median'], summary['import_ms']['p95'],
+            summary['init_ms']['median'], summary['init_ms']['p95']))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+
+if __name__ == '__main__':
+    main()
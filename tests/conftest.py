@@ -0,0 +1,78 @@
+import itertools
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+DATABASE_DIR = tempfile.mkdtemp(prefix='hospital-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(DATABASE_DIR, 'hospital.db')
+os.environ['JOB_WORKERS'] = '0'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1'
+os.environ['HASH_WORKERS'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as hospital
+
+PASSWORD = 'password'
+ADMIN_PASSWORD = 'admin123'
+sequence = itertools.count(1)
+
+@pytest.fixture(scope='session')
+def app():
+    application = hospital.create_app({'TESTING': True})
+    yield application
+    hospital.password_hasher.shutdown()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def create_user(role, **profile):
+    n = next(sequence)
+    username = '%s%d' % (role, n)
+    user = hospital.User(username=username, email='%s@example.com' % username, role=role,
+                         password_hash=hospital.generate_password_hash(PASSWORD, 'pbkdf2:sha256:1'))
+    hospital.db.session.add(user)
+    hospital.db.session.flush()
+    if role == 'doctor':
+        profile.setdefault('department_id', 1)
+        profile.setdefault('available_days', 'Monday-Sunday')
+        record = hospital.Doctor(user_id=user.id, full_name='Doctor %d' % n, **profile)
+    else:
+        record = hospital.Patient(user_id=user.id, full_name='Patient %d' % n, **profile)
+    hospital.db.session.add(record)
+    hospital.db.session.commit()
+    return username, record.id
+
+@pytest.fixture
+def doctor(app):
+    with app.app_context():
+        return create_user('doctor')
+
+@pytest.fixture
+def patient(app):
+    with app.app_context():
+        return create_user('patient')
+
+def login(client, username, password=PASSWORD):
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    return client
+
+@contextmanager
+def capture_statements(app):
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    
+    with app.app_context():
+        engine = hospital.db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
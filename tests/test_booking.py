@@ -0,0 +1,113 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import app as hospital
+from conftest import create_user, login
+
+THREADS = 8
+ROUNDS = 5
+
+def book_concurrently(app, doctor_id, patient_ids, appointment_date, appointment_time):
+    barrier = threading.Barrier(len(patient_ids))
+    results = []
+    
+    def book(patient_id):
+        with app.app_context():
+            barrier.wait()
+            appointment = hospital.book_slot(patient_id, doctor_id, appointment_date, appointment_time, 'stress')
+            results.append(appointment is not None)
+    
+    threads = [threading.Thread(target=book, args=(patient_id,)) for patient_id in patient_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_bookings_never_double_book(app, doctor):
+    with app.app_context():
+        patient_ids = [create_user('patient')[1] for _ in range(THREADS)]
+    appointment_date = date.today() + timedelta(days=1)
+    
+    for round_number in range(ROUNDS):
+        appointment_time = hospital.SLOT_TIMES[round_number]
+        results = book_concurrently(app, doctor[1], patient_ids, appointment_date, appointment_time)
+        assert len(results) == THREADS
+        assert results.count(True) == 1
+    
+    with app.app_context():
+        active = hospital.db.session.query(
+            hospital.Appointment.appointment_time, hospital.func.count()
+        ).filter(
+            hospital.Appointment.doctor_id == doctor[1],
+            hospital.Appointment.appointment_date == appointment_date,
+            hospital.Appointment.status != 'Cancelled'
+        ).group_by(hospital.Appointment.appointment_time).all()
+    assert sorted(active) == sorted((time, 1) for time in hospital.SLOT_TIMES[:ROUNDS])
+
+def test_cancelled_slot_can_be_booked_again(app, doctor, patient):
+    appointment_date = date.today() + timedelta(days=2)
+    with app.app_context():
+        first = hospital.book_slot(patient[1], doctor[1], appointment_date, hospital.SLOT_TIMES[0], 'first')
+        first.status = 'Cancelled'
+        hospital.db.session.commit()
+        second = hospital.book_slot(patient[1], doctor[1], appointment_date, hospital.SLOT_TIMES[0], 'second')
+        assert second is not None and second.id != first.id
+
+def test_other_unique_violations_are_not_slot_conflicts(app):
+    with app.app_context():
+        hospital.db.session.add(hospital.Job(name='test', payload='{}', idempotency_key='duplicate-key',
+                                         max_attempts=1, run_at=datetime.utcnow()))
+        hospital.db.session.commit()
+        hospital.db.session.add(hospital.Job(name='test', payload='{}', idempotency_key='duplicate-key',
+                                         max_attempts=1, run_at=datetime.utcnow()))
+        try:
+            hospital.db.session.commit()
+        except IntegrityError as exc:
+            hospital.db.session.rollback()
+            assert not hospital.is_slot_conflict(exc)
+        else:
+            raise AssertionError('duplicate idempotency key was accepted')
+
+@pytest.mark.parametrize('text, weekdays', [
+    ('', set(range(7))),
+    ('Daily', set(range(7))),
+    ('All days', set(range(7))),
+    ('Every day', set(range(7))),
+    ('Mon (Hall B)', {0}),
+    ('Tue, Thu (small clinic)', {1, 3}),
+    ('Every Friday', {4}),
+    ('Monday to Wednesday', {0, 1, 2}),
+])
+def test_parse_available_days(text, weekdays):
+    assert hospital.parse_available_days(text) == weekdays
+
+def book_through_form(client, doctor_id, appointment_date, appointment_time):
+    response = client.post('/patient/book/%d' % doctor_id, data={
+        'appointment_date': appointment_date, 'appointment_time': appointment_time, 'symptoms': 'form'
+    }, follow_redirects=True)
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+def test_booking_form_rejects_dates_and_times_with_their_own_messages(client, doctor, patient):
+    login(client, patient[0])
+    too_far = (date.today() + timedelta(days=30)).isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    for body in (book_through_form(client, doctor[1], too_far, hospital.SLOT_TIMES[0]),
+                 book_through_form(client, doctor[1], 'not-a-date', hospital.SLOT_TIMES[0])):
+        assert 'Please choose a date between' in body
+        assert 'already booked' not in body
+    body = book_through_form(client, doctor[1], tomorrow, '08:00 PM')
+    assert 'Please choose one of the listed time slots.' in body
+
+def test_booking_form_does_not_trust_the_weekday_parser(app, client, patient):
+    appointment_date = date.today() + timedelta(days=1)
+    with app.app_context():
+        off_day = hospital.WEEKDAY_NAMES[(appointment_date.weekday() + 1) % 7].title()
+        doctor_id = create_user('doctor', available_days='%s (Hall B)' % off_day)[1]
+    login(client, patient[0])
+    body = book_through_form(client, doctor_id, appointment_date.isoformat(), hospital.SLOT_TIMES[0])
+    assert 'Appointment booked successfully!' in body
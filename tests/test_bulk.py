@@ -0,0 +1,56 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import app as hospital
+from conftest import ADMIN_PASSWORD, create_user, login
+
+@pytest.fixture
+def admin_client(client):
+    return login(client, 'admin', ADMIN_PASSWORD)
+
+@pytest.mark.parametrize('payload', [
+    {'doctor_id': 1, 'start': 20261019, 'end': '2026-10-20'},
+    {'doctor_id': [1], 'start': '2026-10-19', 'end': '2026-10-20'},
+    {'doctor_id': 1, 'start': '2026-10-20', 'end': '2026-10-19'},
+    {'doctor_id': 1, 'start': '2020-01-01', 'end': '2030-01-01'},
+    ['2026-10-19', '2026-10-20'],
+])
+def test_bad_bulk_requests_are_rejected(admin_client, payload):
+    for url in ('/admin/appointments/cancel', '/admin/appointments/reschedule'):
+        response = admin_client.post(url, json=payload)
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+
+def test_bulk_cancel_returns_summary(app, admin_client, doctor, patient):
+    appointment_date = date.today() + timedelta(days=3)
+    with app.app_context():
+        hospital.book_slot(patient[1], doctor[1], appointment_date, hospital.SLOT_TIMES[0], 'bulk')
+    response = admin_client.post('/admin/appointments/cancel', json={
+        'doctor_id': doctor[1], 'start': appointment_date.isoformat(), 'end': appointment_date.isoformat()
+    })
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == 1
+
+def test_bulk_reschedule_slot_race_returns_conflict(app, admin_client, doctor, patient, monkeypatch):
+    appointment_date = date.today() + timedelta(days=4)
+    with app.app_context():
+        target_id = create_user('doctor')[1]
+        appointment_id = hospital.book_slot(patient[1], doctor[1], appointment_date, hospital.SLOT_TIMES[1], 'race').id
+    
+    def booked_meanwhile(connection, pairs):
+        raise IntegrityError('UPDATE appointments', {}, sqlite3.IntegrityError(
+            'UNIQUE constraint failed: appointments.doctor_id, appointments.appointment_date, '
+            'appointments.appointment_time'))
+    monkeypatch.setattr(hospital, 'refresh_roster', booked_meanwhile)
+    
+    response = admin_client.post('/admin/appointments/reschedule', json={
+        'doctor_id': doctor[1], 'target_doctor_id': target_id,
+        'start': appointment_date.isoformat(), 'end': appointment_date.isoformat()
+    })
+    assert response.status_code == 409
+    assert 'error' in response.get_json()
+    with app.app_context():
+        assert hospital.db.session.get(hospital.Appointment, appointment_id).doctor_id == doctor[1]
@@ -0,0 +1,16 @@
+import time
+
+import app as hospital
+
+def test_last_modified_outlives_cached_entries(app, monkeypatch):
+    hospital.page_cache.bump('doctors')
+    modified = hospital.page_cache.last_modified()
+    later = time.monotonic() + app.config['CACHE_TTL'] + 1
+    monkeypatch.setattr(hospital.time, 'monotonic', lambda: later)
+    assert hospital.page_cache.last_modified() == modified
+
+def test_last_modified_is_set_when_the_cache_starts(app):
+    cache = hospital.PageCache()
+    with app.app_context():
+        cache.configure()
+    assert cache.last_modified() is not None
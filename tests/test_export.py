@@ -0,0 +1,37 @@
+import csv
+import io
+from datetime import date
+
+import app as hospital
+from conftest import ADMIN_PASSWORD, create_user, login
+
+def export_rows(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+def test_exports_include_archived_years_in_date_order(app, client):
+    year = date.today().year - 2
+    with app.app_context():
+        doctor_id = create_user('doctor')[1]
+        patient_id = create_user('patient')[1]
+        dates = [date(year, 3, 1), date(year + 1, 6, 1), date.today().replace(month=1, day=1)]
+        for n, appointment_date in enumerate(dates):
+            appointment = hospital.Appointment(
+                doctor_id=doctor_id, patient_id=patient_id, appointment_date=appointment_date,
+                appointment_time=hospital.SLOT_TIMES[n], status='Completed' if n < 2 else 'Booked'
+            )
+            hospital.db.session.add(appointment)
+            hospital.db.session.flush()
+            hospital.db.session.add(hospital.Treatment(appointment_id=appointment.id, diagnosis='visit %d' % n))
+        hospital.db.session.commit()
+        assert hospital.archive_appointments(date(year + 1, 12, 31), 100) >= 2
+    
+    login(client, 'admin', ADMIN_PASSWORD)
+    appointments = [row for row in export_rows(client, '/admin/export/appointments?start=%d-01-01' % year)
+                    if row['doctor_id'] == str(doctor_id)]
+    assert [row['appointment_date'] for row in appointments] == [value.isoformat() for value in dates]
+    
+    treatments = [row for row in export_rows(client, '/admin/export/treatments?start=%d-01-01&end=%d-12-31'
+                                             % (year, year)) if row['doctor_id'] == str(doctor_id)]
+    assert [row['diagnosis'] for row in treatments] == ['visit 0']
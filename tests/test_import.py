@@ -0,0 +1,28 @@
+import json
+
+import app as hospital
+
+def test_import_reports_non_object_lines(app, tmp_path):
+    path = tmp_path / 'patients.jsonl'
+    errors_path = tmp_path / 'errors.jsonl'
+    lines = [
+        {'username': 'importok1', 'email': 'importok1@example.com', 'password': 'secret', 'full_name': 'Import One'},
+        [1, 2],
+        'x',
+        {'username': 'importok2', 'email': 'importok2@example.com', 'password': 'secret', 'full_name': 'Import Two'},
+    ]
+    path.write_text('\n'.join(json.dumps(line) for line in lines) + '\n{not json\n')
+    
+    result = app.test_cli_runner().invoke(args=['import-users', str(path), '--workers', '0',
+                                                '--errors', str(errors_path)])
+    assert result.exit_code == 0, result.output
+    
+    errors = [json.loads(line) for line in errors_path.read_text().splitlines()]
+    assert [error['line'] for error in errors] == [2, 3, 5]
+    assert errors[0]['error'] == errors[1]['error'] == 'expected a JSON object'
+    assert errors[2]['error'].startswith('invalid JSON')
+    with app.app_context():
+        assert hospital.db.session.execute(
+            hospital.select(hospital.func.count()).select_from(hospital.User)
+            .where(hospital.User.username.in_(['importok1', 'importok2']))
+        ).scalar() == 2
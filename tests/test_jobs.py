@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import app as hospital
+from conftest import capture_statements
+
+def test_idle_worker_only_reads(app):
+    queue = hospital.JobQueue()
+    with app.app_context():
+        queue.recover()
+    queue.run_pending()
+    
+    with capture_statements(app) as statements:
+        with app.app_context():
+            queue.recover()
+        queue.run_pending()
+    assert statements
+    assert all(statement.lstrip().upper().startswith('SELECT') for statement, parameters in statements), statements
+
+def test_pending_job_is_claimed_and_run(app):
+    calls = []
+    hospital.job_handlers['test_record'] = lambda value: calls.append(value)
+    try:
+        with app.app_context():
+            hospital.enqueue('test_record', {'value': 7})
+            hospital.db.session.commit()
+        assert hospital.JobQueue().run_pending() == 1
+        assert calls == [7]
+        with app.app_context():
+            statuses = hospital.db.session.query(hospital.Job.status).filter_by(name='test_record').all()
+        assert statuses == [('done',)]
+    finally:
+        del hospital.job_handlers['test_record']
+
+def test_old_done_and_failed_jobs_are_pruned(app):
+    now = datetime.utcnow()
+    jobs = {
+        'prune-done': ('done', now - timedelta(days=app.config['JOB_RETENTION_DAYS'] + 1)),
+        'prune-failed': ('failed', now - timedelta(days=app.config['JOB_FAILED_RETENTION_DAYS'] + 1)),
+        'keep-failed': ('failed', now - timedelta(days=app.config['JOB_RETENTION_DAYS'] + 1)),
+    }
+    with app.app_context():
+        hospital.db.session.add_all(
+            hospital.Job(name=name, payload='{}', status=status, max_attempts=1, run_at=created_at, created_at=created_at)
+            for name, (status, created_at) in jobs.items()
+        )
+        hospital.db.session.commit()
+        hospital.JobQueue().recover()
+        remaining = hospital.db.session.query(hospital.Job.name).filter(hospital.Job.name.in_(jobs)).all()
+    assert remaining == [('keep-failed',)]
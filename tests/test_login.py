@@ -0,0 +1,30 @@
+import pytest
+
+import app as hospital
+
+@pytest.fixture
+def behind_proxy(app):
+    original = app.wsgi_app
+    app.config['TRUSTED_PROXIES'] = 1
+    hospital.configure_proxies()
+    yield app
+    app.config['TRUSTED_PROXIES'] = 0
+    hospital.configure_proxies()
+    assert app.wsgi_app is original
+
+def failed_login(client, username, forwarded_for=None):
+    headers = {'X-Forwarded-For': forwarded_for} if forwarded_for else {}
+    return client.post('/login', data={'username': username, 'password': 'wrong'}, headers=headers)
+
+def test_failed_logins_are_throttled_per_username(app, client):
+    for _ in range(app.config['LOGIN_MAX_ATTEMPTS']):
+        assert failed_login(client, 'nobody-user').status_code == 200
+    assert failed_login(client, 'nobody-user').status_code == 429
+
+def test_per_ip_limit_uses_forwarded_address_behind_proxy(behind_proxy, client):
+    failed_login(client, 'nobody-proxied', '203.0.113.7')
+    assert hospital.login_attempts.get(('ip', '203.0.113.7')) == 1
+
+def test_forwarded_header_is_ignored_without_trusted_proxies(app, client):
+    failed_login(client, 'nobody-direct', '198.51.100.9')
+    assert hospital.login_attempts.get(('ip', '198.51.100.9')) is None
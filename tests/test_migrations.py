@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+from sqlalchemy import delete, insert, select
+
+import app as hospital
+
+def test_startup_resolves_double_bookings_before_creating_slot_index(app, doctor, patient):
+    table = hospital.Appointment.__table__
+    appointment_date = date.today() + timedelta(days=5)
+    slot = {'doctor_id': doctor[1], 'patient_id': patient[1], 'appointment_date': appointment_date,
+            'appointment_time': hospital.SLOT_TIMES[3], 'status': 'Booked', 'symptoms': 'migration'}
+    with app.app_context():
+        with hospital.db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP INDEX uq_appointments_active_slot')
+            connection.execute(delete(hospital.SchemaVersion))
+            kept = connection.execute(insert(table).values(slot).returning(table.c.id)).scalar()
+            duplicate = connection.execute(insert(table).values(slot).returning(table.c.id)).scalar()
+        
+        hospital.init_database()
+        
+        with hospital.db.engine.connect() as connection:
+            statuses = dict(connection.execute(
+                select(table.c.id, table.c.status).where(table.c.id.in_([kept, duplicate]))
+            ).all())
+            indexes = {index['name'] for index in hospital.inspect(connection).get_indexes('appointments')}
+            version = hospital.current_schema_version()
+    assert statuses == {kept: 'Booked', duplicate: 'Cancelled'}
+    assert 'uq_appointments_active_slot' in indexes
+    assert version == hospital.SCHEMA_VERSION
+
+def recreate_without_autoincrement(connection, name):
+    definition = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).scalar()
+    connection.exec_driver_sql(definition.replace(name, name + '_legacy', 1).replace(' AUTOINCREMENT', ''))
+    connection.exec_driver_sql('INSERT INTO %s_legacy SELECT * FROM %s' % (name, name))
+    connection.exec_driver_sql('DROP TABLE %s' % name)
+    connection.exec_driver_sql('ALTER TABLE %s_legacy RENAME TO %s' % (name, name))
+    connection.exec_driver_sql('DELETE FROM sqlite_sequence WHERE name = ?', (name,))
+
+def test_new_ids_stay_above_archived_ids_after_upgrade(app, doctor, patient):
+    archived_date = date(date.today().year - 10, 3, 1)
+    with app.app_context():
+        with hospital.db.engine.begin() as connection:
+            for name in ('appointments', 'treatments'):
+                recreate_without_autoincrement(connection, name)
+            connection.execute(delete(hospital.SchemaVersion))
+        hospital.init_database()
+        
+        appointment = hospital.Appointment(doctor_id=doctor[1], patient_id=patient[1], appointment_date=archived_date,
+                                           appointment_time=hospital.SLOT_TIMES[0], status='Completed')
+        hospital.db.session.add(appointment)
+        hospital.db.session.flush()
+        treatment = hospital.Treatment(appointment_id=appointment.id, diagnosis='archived')
+        hospital.db.session.add(treatment)
+        hospital.db.session.commit()
+        archived_ids = appointment.id, treatment.id
+        assert hospital.archive_appointments(date(archived_date.year, 12, 31), 100) == 1
+        
+        fresh = hospital.book_slot(patient[1], doctor[1], date.today() + timedelta(days=6), hospital.SLOT_TIMES[5], 'new')
+        fresh_treatment = hospital.Treatment(appointment_id=fresh.id, diagnosis='new')
+        hospital.db.session.add(fresh_treatment)
+        hospital.db.session.commit()
+        assert fresh.id > archived_ids[0]
+        assert fresh_treatment.id > archived_ids[1]
+        with hospital.db.engine.connect() as connection:
+            indexes = {index['name'] for index in hospital.inspect(connection).get_indexes('appointments')}
+    assert 'uq_appointments_active_slot' in indexes
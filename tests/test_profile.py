@@ -0,0 +1,13 @@
+from sqlalchemy import update
+
+import app as hospital
+from conftest import login
+
+def test_profile_page_reads_changes_from_other_workers(app, client, patient):
+    login(client, patient[0])
+    assert client.get('/patient/dashboard').status_code == 200
+    with app.app_context(), hospital.db.engine.begin() as connection:
+        connection.execute(update(hospital.Patient.__table__)
+                           .where(hospital.Patient.__table__.c.id == patient[1])
+                           .values(full_name='Renamed Elsewhere'))
+    assert b'Renamed Elsewhere' in client.get('/patient/profile').data
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+import pytest
+
+import app as hospital
+from conftest import ADMIN_PASSWORD, PASSWORD, capture_statements, create_user, login
+
+APPOINTMENTS = 30
+
+QUERY_LIMITS = {
+    'admin_appointments': 2,
+    'admin_dashboard': 4,
+    'doctor_appointments': 2,
+    'patient_appointments': 3,
+    'doctor_patient_history': 4,
+}
+PER_ARCHIVE_YEAR = {'patient_appointments', 'doctor_patient_history'}
+
+@pytest.fixture(scope='module')
+def history(app):
+    with app.app_context():
+        doctors = [create_user('doctor') for _ in range(3)]
+        patients = [create_user('patient') for _ in range(3)]
+        today = date.today()
+        for n in range(APPOINTMENTS):
+            doctor_id, patient_id = doctors[n % 3][1], patients[n % 3][1]
+            completed = n % 2 == 0
+            appointment = hospital.Appointment(
+                doctor_id=doctor_id,
+                patient_id=patient_id,
+                appointment_date=today + timedelta(days=(n // 8) + 1) * (-1 if completed else 1),
+                appointment_time=hospital.SLOT_TIMES[n % len(hospital.SLOT_TIMES)],
+                symptoms='symptoms %d' % n,
+                status='Completed' if completed else 'Booked'
+            )
+            hospital.db.session.add(appointment)
+            hospital.db.session.flush()
+            if completed:
+                hospital.db.session.add(hospital.Treatment(appointment_id=appointment.id, diagnosis='diagnosis %d' % n))
+        hospital.db.session.commit()
+    return doctors[0], patients[0]
+
+def route_queries(app, username, url):
+    client = login(app.test_client(), username, ADMIN_PASSWORD if username == 'admin' else PASSWORD)
+    assert client.get(url).status_code == 200
+    with capture_statements(app) as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return [statement for statement, parameters in statements]
+
+@pytest.mark.parametrize('endpoint', sorted(QUERY_LIMITS))
+def test_listing_routes_stay_under_query_limit(app, history, endpoint):
+    doctor, patient = history
+    routes = {
+        'admin_appointments': ('admin', '/admin/appointments'),
+        'admin_dashboard': ('admin', '/admin/dashboard'),
+        'doctor_appointments': (doctor[0], '/doctor/appointments'),
+        'patient_appointments': (patient[0], '/patient/appointments'),
+        'doctor_patient_history': (doctor[0], '/doctor/patient/%d/history' % patient[1]),
+    }
+    username, url = routes[endpoint]
+    statements = route_queries(app, username, url)
+    limit = QUERY_LIMITS[endpoint]
+    if endpoint in PER_ARCHIVE_YEAR:
+        with app.app_context(), hospital.db.engine.connect() as connection:
+            limit += len(hospital.archive_years(connection))
+    assert len(statements) <= limit, '\n'.join(statements)
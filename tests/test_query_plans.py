@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app as hospital
+from conftest import capture_statements, create_user
+
+def query_plan(app, statement, parameters):
+    with app.app_context(), hospital.db.engine.connect() as connection:
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+def plan_for(app, run, table):
+    with capture_statements(app) as captured, app.app_context():
+        run()
+    statements = [(statement, parameters) for statement, parameters in captured if 'FROM %s' % table in statement]
+    assert statements, 'no query against %s was run' % table
+    return query_plan(app, *statements[0])
+
+def assert_uses_index(plan, table, *indexes):
+    details = [line for line in plan if ' %s ' % table in line + ' ']
+    assert details, plan
+    assert all(any('INDEX %s ' % index in line + ' ' for index in indexes) for line in details), plan
+
+@pytest.fixture(scope='module')
+def people(app):
+    with app.app_context():
+        return create_user('doctor')[1], create_user('patient')[1]
+
+def test_slot_availability_uses_doctor_index(app, people):
+    doctor_id, patient_id = people
+    hospital.availability.invalidate(doctor_id)
+    plan = plan_for(app, lambda: hospital.availability.is_free(
+        doctor_id, date.today() + timedelta(days=1), hospital.SLOT_TIMES[0]
+    ), 'appointments')
+    assert_uses_index(plan, 'appointments', 'ix_appointments_doctor_start', 'uq_appointments_active_slot')
+
+def test_slot_conflict_lookup_uses_unique_slot_index(app, people):
+    doctor_id, patient_id = people
+    with app.app_context(), hospital.db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM appointments WHERE doctor_id = ? AND appointment_date = ? "
+            "AND appointment_time = ? AND status != 'Cancelled'",
+            (doctor_id, date.today().isoformat(), hospital.SLOT_TIMES[0])
+        ).all()
+    assert_uses_index([row[-1] for row in rows], 'appointments', 'uq_appointments_active_slot')
+
+def test_doctor_date_range_uses_doctor_start_index(app, people):
+    doctor_id, patient_id = people
+    plan = plan_for(app, lambda: hospital.upcoming_for_doctor(doctor_id), 'appointments')
+    assert_uses_index(plan, 'appointments', 'ix_appointments_doctor_start')
+    
+    now = datetime.now()
+    plan = plan_for(app, lambda: hospital.appointments_between(doctor_id, now, now + timedelta(hours=2)).all(),
+                    'appointments')
+    assert_uses_index(plan, 'appointments', 'ix_appointments_doctor_start')
+
+def test_patient_date_range_uses_patient_date_index(app, people):
+    doctor_id, patient_id = people
+    plan = plan_for(app, lambda: hospital.Appointment.query.filter(
+        hospital.Appointment.patient_id == patient_id,
+        hospital.Appointment.appointment_date >= date.today()
+    ).order_by(hospital.Appointment.appointment_date, hospital.Appointment.slot_minute).all(), 'appointments')
+    assert_uses_index(plan, 'appointments', 'ix_appointments_patient_date')
+
+@pytest.mark.parametrize('model, column, index', [
+    (hospital.Doctor, 'user_id', 'ix_doctors_user_id'),
+    (hospital.Patient, 'user_id', 'ix_patients_user_id'),
+    (hospital.Treatment, 'appointment_id', 'ix_treatments_appointment_id'),
+])
+def test_foreign_key_lookups_use_index(app, model, column, index):
+    plan = plan_for(app, lambda: model.query.filter(getattr(model, column) == 1).all(), model.__tablename__)
+    assert_uses_index(plan, model.__tablename__, index)